@@ -1,15 +1,102 @@
 from django.contrib import admin
-from .models import Customer, Order
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import Category, Customer, Job, Order, OrderStatus, PlannerSettings
+
+# Ниже этого числа строк оценка СУБД неточна, а точный COUNT(*) и так дешев
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimate_table_rows(model, using):
+    """Оценка числа строк таблицы из статистики СУБД (None, если СУБД ее не дает)"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списка админки: без фильтров не делает COUNT(*) по всей таблице"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Настройки для больших таблиц: оценка количества и без второго COUNT(*) при поиске"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    list_display = ('last_name', 'first_name', 'phone', 'created_at')
-    search_fields = ('last_name', 'first_name', 'phone')
+class CustomerAdmin(LargeTableAdmin):
+    list_display = ('last_name', 'first_name', 'phone', 'user', 'created_at')
+    list_select_related = ('user',)
+    # Поиск по префиксу и точному телефону идет по индексам, а не LIKE '%...%':
+    # индекс есть у каждого поля, иначе OR между ними превращается в полный просмотр
+    search_fields = ('^last_name', '^first_name', '=phone')
+    search_help_text = 'Начало фамилии или имени либо телефон целиком'
     list_filter = ('created_at',)
+    autocomplete_fields = ('user',)
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ('title', 'customer', 'price', 'status', 'created_at')
-    search_fields = ('title', 'customer__last_name', 'customer__first_name')
-    list_filter = ('status', 'created_at')
-    raw_id_fields = ('customer',)
\ No newline at end of file
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('title', 'customer', 'price', 'status', 'category', 'user', 'created_at')
+    list_select_related = ('customer', 'customer__user', 'status', 'status__user', 'category', 'category__user', 'user')
+    # Только индексированное поле самого заказа: OR с полями клиента через JOIN
+    # не использует индексы. Заказы клиента открываются фильтром ?customer__id__exact=<id>
+    search_fields = ('^title',)
+    search_help_text = 'Начало названия заказа'
+    # Фильтр по конкретному статусу перечислил бы статусы всех пользователей
+    list_filter = ('status__is_final', 'created_at')
+    autocomplete_fields = ('user', 'customer', 'category', 'status')
+    readonly_fields = ('version', 'planned_end_time')
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'default_price', 'color', 'user')
+    list_select_related = ('user',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('user',)
+
+@admin.register(OrderStatus)
+class OrderStatusAdmin(admin.ModelAdmin):
+    list_display = ('name', 'color', 'is_final', 'user')
+    list_select_related = ('user',)
+    search_fields = ('^name',)
+    list_filter = ('is_final',)
+    autocomplete_fields = ('user',)
+
+@admin.register(PlannerSettings)
+class PlannerSettingsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'hours_per_day', 'work_days', 'day_start_time', 'default_status')
+    list_select_related = ('user', 'default_status', 'default_status__user')
+    search_fields = ('^user__username',)
+    autocomplete_fields = ('user', 'default_status')
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('name', 'status', 'attempts', 'duration_ms', 'run_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('=name',)
+    readonly_fields = ('attempts', 'locked_by', 'started_at', 'heartbeat_at', 'finished_at', 'duration_ms', 'last_error', 'created_at')
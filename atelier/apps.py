@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class AtelierConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'atelier'
\ No newline at end of file
+    name = 'atelier'
+
+    def ready(self):
+        # Подключаем сигналы поискового индекса, журнала изменений и закрепления за основной БД,
+        # регистрируем фоновые задачи
+        from . import db_router, jobs, search, sync  # noqa: F401
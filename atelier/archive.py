@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderStatus
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_ARCHIVE_BATCH_SIZE = 500
+
+
+def archivable_orders(days=None, user=None):
+    """Заказы в завершающих статусах, не менявшиеся дольше days дней"""
+    if days is None:
+        days = getattr(settings, 'ATELIER_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+    # Подзапрос вместо JOIN: select_for_update в archive_orders блокирует только строки заказов
+    orders = Order.objects.filter(
+        status__in=OrderStatus.objects.filter(is_final=True).values('id'),
+        updated_at__lt=timezone.now() - timedelta(days=days),
+    )
+    if user is not None:
+        orders = orders.filter(user=user)
+    return orders
+
+def archive_orders(days=None, batch_size=None, user=None):
+    """Переносит подходящие заказы в архив пачками, каждая пачка - в своей транзакции.
+
+    Строки пачки блокируются (SELECT ... FOR UPDATE) и перепроверяются тем же условием:
+    заказ, который успели изменить между выбором и блокировкой, остается на месте.
+    Копируются значения из блокирующего чтения, а не из снимка начала транзакции.
+    Возвращает количество перенесенных заказов.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'ATELIER_ARCHIVE_BATCH_SIZE', DEFAULT_ARCHIVE_BATCH_SIZE)
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            candidates = list(archivable_orders(days, user).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not candidates:
+                break
+            rows = list(archivable_orders(days, user)
+                        .filter(id__in=candidates)
+                        .select_for_update()
+                        .values(*ArchivedOrder.ARCHIVED_FIELDS))
+            ids = [row['id'] for row in rows]
+            ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in rows])
+            # Поисковые термы заказа удаляются каскадом
+            Order.objects.filter(id__in=ids).delete()
+        total += len(ids)
+    return total
+
+@transaction.atomic
+def restore_order(archived_order):
+    """Возвращает заказ из архива в основную таблицу с тем же id"""
+    values = {field: getattr(archived_order, field) for field in ArchivedOrder.ARCHIVED_FIELDS}
+    order = Order(**values)
+    # save() переиндексирует заказ для поиска; updated_at обновится - заказ снова "свежий"
+    order.save(force_insert=True)
+    archived_order.delete()
+    return order
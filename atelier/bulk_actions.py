@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .events import publish_order_event
+from .models import ChangeLogEntry, Order, RecurringOrderSkip
+from .planning import renumber_day
+from .sync import log_changes
+
+# Ограничение на размер одного действия, чтобы IN (...) оставался разумным
+MAX_BULK_ORDERS = 500
+
+
+def publish_orders(order_ids, event_type):
+    for order in Order.objects.filter(id__in=order_ids).select_related('customer'):
+        publish_order_event(order, event_type)
+
+def update_orders(user, order_ids, **values):
+    """Один UPDATE ... WHERE id IN (...) AND user_id = ? с увеличением версии.
+
+    Возвращает количество измененных заказов.
+    """
+    with transaction.atomic():
+        ids = list(Order.objects.filter(user=user, id__in=order_ids).values_list('id', flat=True))
+        count = Order.objects.filter(user=user, id__in=ids).update(
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+            **values
+        )
+        # update() обходит сигналы, поэтому журнал изменений пополняется явно
+        log_changes(user.pk, 'orders', ids, ChangeLogEntry.ACTION_UPSERT)
+    publish_orders(ids, 'updated')
+    return count
+
+def set_status(user, order_ids, status):
+    return update_orders(user, order_ids, status=status)
+
+def set_category(user, order_ids, category):
+    return update_orders(user, order_ids, category=category)
+
+def reschedule(user, order_ids, planned_date):
+    """Переносит заказы на дату (или снимает с планирования при planned_date=None).
+
+    Время начала сбрасывается, чтобы не создать пересечений в новом дне;
+    заказы встают в конец дня, затронутые дни перенумеровываются.
+    """
+    with transaction.atomic():
+        rows = list(Order.objects.filter(user=user, id__in=order_ids).values_list('id', 'planned_date'))
+        ids = [pk for pk, day in rows]
+        source_dates = {day for pk, day in rows if day and day != planned_date}
+        count = Order.objects.filter(user=user, id__in=ids).update(
+            planned_date=planned_date,
+            order_in_day=None,
+            planned_start_time=None,
+            planned_end_time=None,
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+        changed = set(ids)
+        for day in source_dates | ({planned_date} if planned_date else set()):
+            changed.update(renumber_day(user, day))
+        log_changes(user.pk, 'orders', changed, ChangeLogEntry.ACTION_UPSERT)
+    publish_orders(ids, 'moved')
+    return count
+
+def delete_orders(user, order_ids):
+    """Удаляет заказы пользователя, сохраняя пропуски для повторений"""
+    with transaction.atomic():
+        orders = Order.objects.filter(user=user, id__in=order_ids)
+        # Иначе удаленные повторения снова появятся в планере
+        RecurringOrderSkip.objects.bulk_create([
+            RecurringOrderSkip(recurring_order_id=recurring_order_id, date=occurrence_date)
+            for recurring_order_id, occurrence_date in orders
+            .filter(recurring_order__isnull=False, occurrence_date__isnull=False)
+            .values_list('recurring_order_id', 'occurrence_date')
+        ], ignore_conflicts=True)
+        ids = list(orders.values_list('id', flat=True))
+        deleted = Order.objects.filter(user=user, id__in=ids).delete()[1].get(Order._meta.label, 0)
+    for pk in ids:
+        publish_order_event(Order(pk=pk, user=user), 'deleted')
+    return deleted
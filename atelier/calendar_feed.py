@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .models import ChangeLogEntry, Order
+
+DEFAULT_CALENDAR_PAST_DAYS = 30
+# Меняется при изменении формата ленты, чтобы клиенты не держали старую версию
+FEED_VERSION = 1
+LINE_LIMIT = 75
+
+FEED_FIELDS = ('id', 'title', 'comment', 'planned_date', 'planned_start_time', 'planned_minutes', 'updated_at')
+
+
+def feed_orders(user_id):
+    """Запланированные заказы ленты: с начала окна (прошедшие дни отсекаются) без ограничения вперед"""
+    days = getattr(settings, 'ATELIER_CALENDAR_PAST_DAYS', DEFAULT_CALENDAR_PAST_DAYS)
+    window_start = timezone.localdate() - timedelta(days=days)
+    return window_start, Order.objects.filter(user_id=user_id, planned_date__gte=window_start)
+
+def etag_timestamp(value):
+    # Микросекунды: две правки в одну секунду дают разные ETag
+    return str(int(value.timestamp() * 1000000)) if value else '0'
+
+def feed_state(user_id):
+    """ETag и Last-Modified ленты без чтения самих заказов.
+
+    Изменения ловит максимальный updated_at, удаления - число заказов и журнал
+    удалений (у удаленного заказа updated_at уже не прочитать).
+    """
+    window_start, orders = feed_orders(user_id)
+    state = orders.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    last_deleted = (ChangeLogEntry.objects
+                    .filter(user_id=user_id, model='orders', action=ChangeLogEntry.ACTION_DELETE)
+                    .aggregate(last=Max('created_at'))['last'])
+
+    changes = [value for value in (state['last_updated'], last_deleted) if value]
+    last_modified = max(changes) if changes else None
+    etag = quote_etag('-'.join([
+        str(FEED_VERSION),
+        window_start.strftime('%Y%m%d'),
+        str(state['count']),
+        etag_timestamp(state['last_updated']),
+        etag_timestamp(last_deleted),
+    ]))
+    return etag, last_modified
+
+def escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def fold_line(line):
+    """Переносит строку по 75 октетов (RFC 5545), не разрывая символы UTF-8"""
+    parts = []
+    current = ''
+    limit = LINE_LIMIT
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = ''
+            # Строки продолжения начинаются с пробела, он тоже занимает октет
+            limit = LINE_LIMIT - 1
+        current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+def event_lines(order, domain):
+    order_id, title, comment, planned_date, start_time, minutes, updated_at = order
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:order-{order_id}@{domain}',
+        f'DTSTAMP:{format_utc(updated_at)}',
+        f'LAST-MODIFIED:{format_utc(updated_at)}',
+        f'SUMMARY:{escape_text(title)}',
+    ]
+    if start_time:
+        # Время в планере - местное время мастерской
+        start = timezone.make_aware(datetime.combine(planned_date, start_time))
+        lines += [
+            f'DTSTART:{format_utc(start)}',
+            f'DTEND:{format_utc(start + timedelta(minutes=minutes))}',
+        ]
+    else:
+        # Заказ без времени - событие на весь день
+        lines += [
+            f'DTSTART;VALUE=DATE:{planned_date:%Y%m%d}',
+            f'DTEND;VALUE=DATE:{planned_date + timedelta(days=1):%Y%m%d}',
+        ]
+    if comment:
+        lines.append(f'DESCRIPTION:{escape_text(comment)}')
+    lines.append('END:VEVENT')
+    return lines
+
+def iter_feed(orders, domain, name):
+    """Построчно отдает календарь; заказы читаются одним запросом порциями"""
+    for line in ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:-//{domain}//Sewing atelier//RU',
+                 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH', f'X-WR-CALNAME:{escape_text(name)}']:
+        yield fold_line(line)
+    for order in orders.order_by('planned_date', 'planned_start_time', 'id').values_list(*FEED_FIELDS).iterator(chunk_size=500):
+        for line in event_lines(order, domain):
+            yield fold_line(line)
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedOrder, ChangeLogEntry, Customer, Order, RecurringOrder, normalize_phone
+from .sync import log_changes
+
+
+def find_duplicate_customers(user=None):
+    """Клиенты без нормализованного телефона, у которых он на самом деле есть.
+
+    Возвращает {клиент, который остается: [дубли]}. Остается клиент с заполненным
+    phone_normalized, а если такого нет - самый ранний; у такого клиента список
+    дублей может быть пустым, тогда слияние только заполнит его телефон.
+    """
+    candidates = Customer.objects.filter(phone_normalized__isnull=True).order_by('id')
+    if user is not None:
+        candidates = candidates.filter(user=user)
+
+    keepers = {}
+    duplicates = {}
+    for customer in candidates.iterator():
+        normalized = normalize_phone(customer.phone)
+        if not normalized:
+            continue
+        key = (customer.user_id, normalized)
+        if key not in keepers:
+            keepers[key] = (Customer.objects.filter(user_id=customer.user_id, phone_normalized=normalized).first()
+                            or customer)
+            duplicates[keepers[key]] = []
+        if keepers[key] != customer:
+            duplicates[keepers[key]].append(customer)
+    return duplicates
+
+def describe_customer(customer):
+    parts = [f'{customer.last_name} {customer.first_name}'.strip(), customer.phone]
+    if customer.comment:
+        parts.append(customer.comment)
+    return ', '.join(part for part in parts if part)
+
+def merge_customers(keeper, duplicates):
+    """Переносит заказы дублей к keeper, удаляет дубли и заполняет телефон keeper.
+
+    Имена, телефоны и комментарии дублей дописываются в комментарий keeper,
+    журнал синхронизации получает удаления дублей и изменения перенесенных заказов.
+    """
+    duplicate_ids = [customer.pk for customer in duplicates]
+    with transaction.atomic():
+        order_ids = list(Order.objects.filter(customer_id__in=duplicate_ids).values_list('id', flat=True))
+        Order.objects.filter(id__in=order_ids).update(
+            customer=keeper,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        ArchivedOrder.objects.filter(customer_id__in=duplicate_ids).update(customer=keeper)
+        RecurringOrder.objects.filter(customer_id__in=duplicate_ids).update(customer=keeper)
+        # update() обходит сигналы, поэтому журнал изменений пополняется явно
+        log_changes(keeper.user_id, 'orders', order_ids, ChangeLogEntry.ACTION_UPSERT)
+
+        notes = [f'Объединен с клиентом: {describe_customer(customer)}' for customer in duplicates]
+        keeper.comment = '\n'.join(filter(None, [keeper.comment, *notes]))
+        keeper.save()
+        # Удаление через QuerySet отправляет post_delete: журнал получает записи об удалении
+        Customer.objects.filter(id__in=duplicate_ids).delete()
+    return len(order_ids)
@@ -0,0 +1,155 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+PRIMARY_DB_ALIAS = 'default'
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE_NAME = 'atelier_primary_until'
+DEFAULT_PIN_SECONDS = 10
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Чтение с реплики разрешено только внутри отмеченных представлений и команд
+_replica_reads = ContextVar('atelier_replica_reads', default=False)
+# После собственной записи пользователь читает с основной базы
+_pinned_to_primary = ContextVar('atelier_pinned_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+def get_pin_seconds():
+    return getattr(settings, 'ATELIER_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока уходят на реплику, если она настроена"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+@contextmanager
+def pinned_to_primary(pinned=True):
+    token = _pinned_to_primary.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+def use_replica(view_func):
+    """Декоратор для read-only представлений: GET-запросы читают с реплики"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await view_func(request, *args, **kwargs)
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Запись - всегда в основную базу, чтение - на реплику только там, где это разрешено.
+
+    Реплика наполняется репликацией СУБД, поэтому миграции к ней не применяются.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _pinned_to_primary.get() and replica_configured():
+            return REPLICA_DB_ALIAS
+        return PRIMARY_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
+
+
+def pin_after_write(sender, **kwargs):
+    # Запись посреди запроса: дальнейшие чтения этого запроса - с основной базы.
+    # db_for_write для этого не подходит: Django вызывает его и без записи,
+    # например при присваивании связанного объекта
+    _pinned_to_primary.set(True)
+
+post_save.connect(pin_after_write, dispatch_uid='atelier_pin_after_save')
+post_delete.connect(pin_after_write, dispatch_uid='atelier_pin_after_delete')
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes: после POST-запроса пользователь несколько секунд читает с основной базы.
+
+    Срок хранится в cookie, поэтому закрепление работает между запросами
+    и воркерами без общего состояния.
+    """
+
+    # Без блокирующих операций, поэтому в обоих режимах: иначе Django переводил бы
+    # асинхронные представления в поток ради этого звена
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+
+        is_write = request.method not in SAFE_METHODS
+        with pinned_to_primary(is_write or self.is_pinned(request)):
+            response = self.get_response(request)
+        self.set_pin_cookie(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+
+        is_write = request.method not in SAFE_METHODS
+        with pinned_to_primary(is_write or self.is_pinned(request)):
+            response = await self.get_response(request)
+        self.set_pin_cookie(request, response)
+        return response
+
+    def set_pin_cookie(self, request, response):
+        if request.method not in SAFE_METHODS:
+            pin_seconds = get_pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                str(int(time.time()) + pin_seconds),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+
+    def is_pinned(self, request):
+        try:
+            pinned_until = int(request.COOKIES.get(PIN_COOKIE_NAME, 0))
+        except ValueError:
+            return False
+        return pinned_until > time.time()
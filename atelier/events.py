@@ -0,0 +1,180 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class BaseEventBroker:
+    """Брокер событий планера: публикация из представлений и подписка из SSE-потока.
+
+    Для нескольких воркеров нужен брокер, общий для процессов (CacheEventBroker
+    или свой наследник этого класса), путь к нему - в settings.ATELIER_EVENTS_BACKEND.
+    """
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        """Возвращает подписку с методами async get() и close()"""
+        raise NotImplementedError
+
+
+class InProcessSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=broker.queue_size)
+
+    def put(self, event):
+        if self.queue.full():
+            # Медленный клиент теряет самые старые события, а не блокирует остальных
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessEventBroker(BaseEventBroker):
+    """Брокер в памяти процесса: подходит для одного ASGI-воркера"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            # publish может вызываться из потока синхронного представления
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                pass
+
+    def subscribe(self, user_id):
+        subscription = InProcessSubscription(self, user_id)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self.subscribers.pop(subscription.user_id, None)
+
+
+class CacheSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.last_seq = None
+        self.pending = []
+
+    async def get(self):
+        cache = self.broker.cache
+        seq_key = self.broker.seq_key(self.user_id)
+        if self.last_seq is None:
+            # Подписчик получает только события, опубликованные после подключения
+            self.last_seq = await cache.aget(seq_key, 0)
+        while not self.pending:
+            current = await cache.aget(seq_key, 0)
+            if current < self.last_seq:
+                # Счетчик вытеснен из кэша и начат заново
+                self.last_seq = 0
+            if current > self.last_seq:
+                first = max(self.last_seq + 1, current - self.broker.queue_size + 1)
+                keys = [self.broker.event_key(self.user_id, seq) for seq in range(first, current + 1)]
+                found = await cache.aget_many(keys)
+                # Истекшие события пропускаются
+                self.pending = [found[key] for key in keys if key in found]
+                self.last_seq = current
+            if not self.pending:
+                await asyncio.sleep(self.broker.poll_interval)
+        return self.pending.pop(0)
+
+    def close(self):
+        pass
+
+
+class CacheEventBroker(BaseEventBroker):
+    """Брокер через кэш Django: события видят все воркеры и процессы.
+
+    Кэш должен быть общим для процессов (Redis, Memcached, DatabaseCache),
+    с LocMemCache брокер работает только в одном процессе. Подписки опрашивают
+    кэш раз в poll_interval секунд, события хранятся event_ttl секунд.
+    """
+
+    def __init__(self, cache_alias='default', poll_interval=1, event_ttl=60, queue_size=100):
+        self.cache = caches[cache_alias]
+        self.poll_interval = poll_interval
+        self.event_ttl = event_ttl
+        self.queue_size = queue_size
+
+    def seq_key(self, user_id):
+        return f'atelier:events:{user_id}:seq'
+
+    def event_key(self, user_id, seq):
+        return f'atelier:events:{user_id}:{seq}'
+
+    def publish(self, user_id, event):
+        seq_key = self.seq_key(user_id)
+        # add + incr атомарны в общем кэше: номера событий не повторяются между процессами
+        self.cache.add(seq_key, 0, timeout=None)
+        try:
+            seq = self.cache.incr(seq_key)
+        except ValueError:
+            # Счетчик вытеснен между add и incr
+            self.cache.add(seq_key, 0, timeout=None)
+            seq = self.cache.incr(seq_key)
+        self.cache.set(self.event_key(user_id, seq), event, timeout=self.event_ttl)
+
+    def subscribe(self, user_id):
+        return CacheSubscription(self, user_id)
+
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = getattr(settings, 'ATELIER_EVENTS_BACKEND', 'atelier.events.InProcessEventBroker')
+        _broker = import_string(backend)()
+    return _broker
+
+def order_event_data(order):
+    return {
+        'id': order.pk,
+        'title': order.title,
+        'customer_first_name': order.customer.first_name if order.customer_id else '',
+        'planned_date': order.planned_date.isoformat() if hasattr(order.planned_date, 'isoformat') else order.planned_date,
+        'planned_minutes': order.planned_minutes,
+        'order_in_day': order.order_in_day,
+        'color': order.color,
+        'version': order.version,
+    }
+
+def publish_order_event(order, event_type):
+    """Сообщает открытым планерам пользователя об изменении заказа.
+
+    event_type: 'created', 'updated', 'moved' или 'deleted'.
+    """
+    if event_type == 'deleted':
+        data = {'id': order.pk}
+    else:
+        data = order_event_data(order)
+    get_broker().publish(order.user_id, {'type': event_type, 'order': data})
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
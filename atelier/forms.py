@@ -1,8 +1,14 @@
+import re
+
 from django import forms
-from .models import Customer, Order, OrderStatus, PlannerSettings, Category
+from .models import Customer, Order, OrderStatus, PlannerSettings, Category, RecurringOrder, normalize_phone
+from .bulk_actions import MAX_BULK_ORDERS
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
 
+PHONE_CHARS_RE = re.compile(r'^\+?[\d\s()-]+$')
+VERSION_CONFLICT_MESSAGE = 'Заказ изменили в другом окне или на другом устройстве. Откройте его заново и повторите правку.'
+
 class RegisterForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={'class': 'form-control'}))
     
@@ -35,6 +41,23 @@ class CustomerForm(forms.ModelForm):
             'comment': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+    def clean_phone(self):
+        phone = self.cleaned_data['phone']
+        if self.user and normalize_phone(phone):
+            duplicate = (Customer.objects
+                         .filter(user=self.user, phone_normalized=normalize_phone(phone))
+                         .exclude(pk=self.instance.pk)
+                         .first())
+            if duplicate:
+                raise forms.ValidationError(
+                    f'Клиент с этим телефоном уже есть: {duplicate.last_name} {duplicate.first_name}'.strip()
+                )
+        return phone
+
 class OrderForm(forms.ModelForm):
     customer_first_name = forms.CharField(
         max_length=100, 
@@ -58,11 +81,13 @@ class OrderForm(forms.ModelForm):
             'id': 'id_customer_phone'
         })
     )
+    # Версия заказа на момент открытия формы: правка поверх чужих изменений отклоняется
+    version = forms.IntegerField(required=False, widget=forms.HiddenInput)
     
     class Meta:
         model = Order
         fields = ['title', 'category', 'price', 'comment', 'status', 
-                 'planned_date', 'planned_minutes']
+                 'planned_date', 'planned_start_time', 'planned_minutes']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'category': forms.Select(attrs={'class': 'form-control', 'id': 'id_category'}),
@@ -74,6 +99,10 @@ class OrderForm(forms.ModelForm):
                 'type': 'date',
                 'id': 'id_planned_date'
             }),
+            'planned_start_time': forms.TimeInput(attrs={
+                'class': 'form-control',
+                'type': 'time'
+            }, format='%H:%M'),
             'planned_minutes': forms.NumberInput(attrs={
                 'class': 'form-control', 
                 'min': 1,
@@ -94,9 +123,14 @@ class OrderForm(forms.ModelForm):
         if self.instance and self.instance.pk and self.instance.customer:
             self.initial['customer_first_name'] = self.instance.customer.first_name
             self.initial['customer_phone'] = self.instance.customer.phone
+        if self.instance and self.instance.pk:
+            self.initial['version'] = self.instance.version
     
     def clean(self):
         cleaned_data = super().clean()
+        version = cleaned_data.get('version')
+        if self.instance.pk and version is not None and version != self.instance.version:
+            raise forms.ValidationError(VERSION_CONFLICT_MESSAGE)
         first_name = cleaned_data.get('customer_first_name')
         phone = cleaned_data.get('customer_phone')
         
@@ -105,6 +139,26 @@ class OrderForm(forms.ModelForm):
             self.add_error('customer_first_name', 'Обязательное поле')
         if not phone:
             self.add_error('customer_phone', 'Обязательное поле')
+        elif not PHONE_CHARS_RE.match(phone) or not normalize_phone(phone):
+            # По цифрам ищется клиент: без них все такие заказы достались бы одному клиенту
+            self.add_error('customer_phone', 'Телефон должен состоять из цифр, например +79991234567')
+        
+        # Проверяем, что слот не пересекается с другими заказами дня
+        planned_date = cleaned_data.get('planned_date')
+        start_time = cleaned_data.get('planned_start_time')
+        minutes = cleaned_data.get('planned_minutes')
+        if start_time and not planned_date:
+            self.add_error('planned_start_time', 'Время начала задается только вместе с датой')
+        elif start_time and minutes and self.user:
+            conflict = Order.slot_conflicts(
+                self.user, planned_date, start_time, minutes, exclude_pk=self.instance.pk
+            ).first()
+            if conflict:
+                self.add_error(
+                    'planned_start_time',
+                    f'Пересекается с заказом «{conflict.title}» '
+                    f'({conflict.planned_start_time:%H:%M}–{conflict.planned_end_time:%H:%M})'
+                )
         
         return cleaned_data
     
@@ -113,20 +167,14 @@ class OrderForm(forms.ModelForm):
         first_name = self.cleaned_data['customer_first_name']
         phone = self.cleaned_data['customer_phone']
         
-        # Ищем существующего клиента или создаем нового
-        try:
-            customer = Customer.objects.get(user=self.user, phone=phone)
-            # Обновляем имя, если клиент уже существовал
-            customer.first_name = first_name
-            customer.save()
-        except Customer.DoesNotExist:
-            # Создаем нового клиента
-            customer = Customer.objects.create(
-                user=self.user,
-                first_name=first_name,
-                last_name='',  # Можно добавить логику для фамилии если нужно
-                phone=phone
-            )
+        # Ищем клиента по нормализованному телефону (уникальный индекс) или создаем нового.
+        # update_or_create сам повторяет поиск, если клиента параллельно создал другой запрос
+        customer, created = Customer.objects.update_or_create(
+            user=self.user,
+            phone_normalized=normalize_phone(phone),
+            defaults={'first_name': first_name},
+            create_defaults={'first_name': first_name, 'last_name': '', 'phone': phone},
+        )
         
         order.customer = customer
         order.user = self.user  # Убедимся, что пользователь установлен
@@ -137,15 +185,29 @@ class OrderForm(forms.ModelForm):
         return order
 
 class OrderStatusForm(forms.ModelForm):
+    # Статус по умолчанию хранится в PlannerSettings.default_status
+    is_default = forms.BooleanField(
+        required=False,
+        label="Статус по умолчанию",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
     class Meta:
         model = OrderStatus
-        fields = ['name', 'color', 'is_default']
+        fields = ['name', 'color', 'is_final']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'color': forms.TextInput(attrs={'class': 'form-control', 'type': 'color'}),
-            'is_default': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'is_final': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance and self.instance.pk:
+            self.initial['is_default'] = (
+                PlannerSettings.get_default_status_id(self.instance.user_id) == self.instance.pk
+            )
+
 class CategoryForm(forms.ModelForm):
     class Meta:
         model = Category
@@ -159,8 +221,108 @@ class CategoryForm(forms.ModelForm):
 class PlannerSettingsForm(forms.ModelForm):
     class Meta:
         model = PlannerSettings
-        fields = ['hours_per_day', 'work_days']
+        fields = ['hours_per_day', 'day_start_time', 'work_days']
         widgets = {
             'hours_per_day': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 24}),
+            'day_start_time': forms.TimeInput(attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
             'work_days': forms.TextInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+    
+    def clean_work_days(self):
+        values = [value.strip() for value in self.cleaned_data['work_days'].split(',') if value.strip()]
+        if not values:
+            raise forms.ValidationError('Укажите хотя бы один рабочий день')
+        if not all(value.isdecimal() and 1 <= int(value) <= 7 for value in values):
+            raise forms.ValidationError('Дни указываются числами от 1 (понедельник) до 7 (воскресенье) через запятую')
+        return ','.join(str(day) for day in sorted({int(value) for value in values}))
+
+class RecurringOrderForm(forms.ModelForm):
+    class Meta:
+        model = RecurringOrder
+        fields = ['title', 'customer', 'category', 'price', 'planned_minutes',
+                  'interval_work_days', 'start_date', 'end_date', 'is_active', 'comment']
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'form-control'}),
+            'customer': forms.Select(attrs={'class': 'form-control'}),
+            'category': forms.Select(attrs={'class': 'form-control'}),
+            'price': forms.NumberInput(attrs={'class': 'form-control'}),
+            'planned_minutes': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'interval_work_days': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'start_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'comment': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+        if self.user:
+            self.fields['customer'].queryset = Customer.objects.filter(user=self.user)
+            self.fields['category'].queryset = Category.objects.filter(user=self.user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            self.add_error('end_date', 'Дата окончания раньше даты начала')
+        if cleaned_data.get('interval_work_days') == 0:
+            self.add_error('interval_work_days', 'Интервал должен быть не меньше 1')
+        return cleaned_data
+
+class OrderBulkActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ('set_status', 'Изменить статус'),
+        ('set_category', 'Изменить категорию'),
+        ('reschedule', 'Перенести на дату'),
+        ('unschedule', 'Снять с планирования'),
+        ('delete', 'Удалить'),
+    ]
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES, widget=forms.Select(attrs={'class': 'form-control'}))
+    order_ids = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+    status = forms.ModelChoiceField(
+        queryset=OrderStatus.objects.none(),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.none(),
+        required=False,
+        empty_label='Без категории',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    planned_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d')
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+
+        if self.user:
+            self.fields['status'].queryset = OrderStatus.objects.filter(user=self.user)
+            self.fields['category'].queryset = Category.objects.filter(user=self.user)
+
+    def clean_order_ids(self):
+        try:
+            order_ids = {int(pk) for pk in self.cleaned_data.get('order_ids') or []}
+        except (ValueError, TypeError):
+            raise forms.ValidationError('Некорректный список заказов')
+        if not order_ids:
+            raise forms.ValidationError('Не выбрано ни одного заказа')
+        if len(order_ids) > MAX_BULK_ORDERS:
+            raise forms.ValidationError(f'За один раз можно изменить не больше {MAX_BULK_ORDERS} заказов')
+        return sorted(order_ids)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == 'set_status' and not cleaned_data.get('status'):
+            self.add_error('status', 'Выберите статус')
+        if action == 'reschedule' and not cleaned_data.get('planned_date'):
+            self.add_error('planned_date', 'Выберите дату')
+        return cleaned_data
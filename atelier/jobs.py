@@ -0,0 +1,176 @@
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max
+from django.utils import timezone
+
+from .archive import archive_orders
+from .models import Job
+from .search import rebuild_index
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 30
+DEFAULT_HEARTBEAT_SECONDS = 30
+DEFAULT_STALE_SECONDS = 120
+DEFAULT_KEEP_DAYS = 7
+
+# Имя задачи -> функция; задачи регистрируются декоратором register_job
+_registry = {}
+
+
+def register_job(name):
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+def get_job_setting(name, default):
+    return getattr(settings, f'ATELIER_JOBS_{name}', default)
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """Ставит задачу в очередь и сразу возвращает Job.
+
+    Параметры должны сериализоваться в JSON. Воркер увидит задачу только после
+    коммита текущей транзакции. При ATELIER_JOBS_IMMEDIATE = True задача
+    выполняется в этом же процессе сразу после коммита (для тестов и разработки).
+    """
+    if name not in _registry:
+        raise LookupError(f'Unknown job: {name}')
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or get_job_setting('MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+    )
+    if get_job_setting('IMMEDIATE', False) and run_at is None:
+        transaction.on_commit(lambda: run_claimed(job.pk, 'immediate'))
+    return job
+
+def claim_job(job_id, worker_id):
+    """Условный UPDATE: из нескольких воркеров задачу получает ровно один"""
+    now = timezone.now()
+    return bool(Job.objects
+                .filter(pk=job_id, status=Job.STATUS_PENDING)
+                .update(status=Job.STATUS_RUNNING,
+                        locked_by=worker_id,
+                        started_at=now,
+                        heartbeat_at=now,
+                        attempts=F('attempts') + 1))
+
+def claim_next_job(worker_id):
+    candidates = (Job.objects
+                  .filter(status=Job.STATUS_PENDING, run_at__lte=timezone.now())
+                  .order_by('run_at', 'id')
+                  .values_list('id', flat=True)[:10])
+    for job_id in candidates:
+        if claim_job(job_id, worker_id):
+            return Job.objects.get(pk=job_id)
+    return None
+
+def run_claimed(job_id, worker_id):
+    if claim_job(job_id, worker_id):
+        run_job(Job.objects.get(pk=job_id))
+
+@contextmanager
+def heartbeat(job):
+    """Пока выполняется блок, отдельный поток обновляет heartbeat_at задачи.
+
+    Долгая задача живого воркера так не считается брошенной, а задачу умершего
+    воркера requeue_stale_jobs вернет в очередь через STALE_SECONDS, а не через
+    максимальное время выполнения.
+    """
+    stop = threading.Event()
+    interval = get_job_setting('HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                Job.objects.filter(pk=job.pk, status=Job.STATUS_RUNNING, locked_by=job.locked_by).update(
+                    heartbeat_at=timezone.now()
+                )
+        finally:
+            # У потока свое соединение с базой
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def run_job(job):
+    """Выполняет захваченную задачу и записывает результат и время выполнения.
+
+    Упавшая задача возвращается в очередь с экспоненциальной задержкой,
+    пока не исчерпает max_attempts.
+    """
+    started = time.monotonic()
+    try:
+        func = _registry.get(job.name)
+        if func is None:
+            raise LookupError(f'Unknown job: {job.name}')
+        with heartbeat(job):
+            func(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.STATUS_PENDING
+            delay = get_job_setting('RETRY_DELAY', DEFAULT_RETRY_DELAY) * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.STATUS_FAILED
+    else:
+        job.status = Job.STATUS_DONE
+        job.last_error = ''
+    job.duration_ms = int((time.monotonic() - started) * 1000)
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.save(update_fields=['status', 'last_error', 'run_at', 'duration_ms', 'finished_at', 'locked_by'])
+    return job
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, воркер которых умер, не завершив их.
+
+    Брошенной считается задача без сигнала воркера (heartbeat_at) дольше STALE_SECONDS.
+    """
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - timedelta(seconds=get_job_setting('STALE_SECONDS', DEFAULT_STALE_SECONDS)),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, locked_by='', last_error='Воркер не завершил задачу'
+    )
+    requeued = stale.update(status=Job.STATUS_PENDING, locked_by='', run_at=timezone.now())
+    return requeued + failed
+
+def prune_finished_jobs(days=None):
+    if days is None:
+        days = get_job_setting('KEEP_DAYS', DEFAULT_KEEP_DAYS)
+    return Job.objects.filter(
+        status__in=[Job.STATUS_DONE, Job.STATUS_FAILED],
+        finished_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
+
+def job_stats():
+    """Количество задач и время выполнения по именам и статусам (для мониторинга)"""
+    return (Job.objects
+            .values('name', 'status')
+            .annotate(count=Count('id'), avg_ms=Avg('duration_ms'), max_ms=Max('duration_ms'))
+            .order_by('name', 'status'))
+
+
+@register_job('archive_orders')
+def archive_orders_job(days=None, batch_size=None, user_id=None):
+    archive_orders(days, batch_size, User.objects.get(pk=user_id) if user_id else None)
+
+@register_job('rebuild_search_index')
+def rebuild_search_index_job(user_id=None):
+    rebuild_index(User.objects.get(pk=user_id) if user_id else None)
@@ -0,0 +1,97 @@
+import http.cookiejar
+import json
+import math
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class LoginError(Exception):
+    pass
+
+
+class NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    # Редирект после POST - часть ответа, а не новый запрос: иначе его время попадет в замер
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """HTTP-сессия залогиненного пользователя поверх urllib"""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+            NoRedirectHandler,
+        )
+        self.login(username, password)
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None, headers=None):
+        """Возвращает (HTTP-статус, тело, адрес редиректа)"""
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            headers={'Referer': self.base_url + '/', **(headers or {})},
+        )
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.read(), None
+        except urllib.error.HTTPError as error:
+            return error.code, error.read(), error.headers.get('Location')
+
+    def get(self, path):
+        return self.request(path)
+
+    def post_form(self, path, fields):
+        data = urllib.parse.urlencode({**fields, 'csrfmiddlewaretoken': self.csrf_token()}).encode()
+        return self.request(path, data, {'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def post_json(self, path, payload):
+        return self.request(path, json.dumps(payload).encode(), {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': self.csrf_token(),
+            'X-Requested-With': 'XMLHttpRequest',
+        })
+
+    def login(self, username, password):
+        self.get('/login/')
+        status, body, location = self.post_form('/login/', {'username': username, 'password': password})
+        if status != 302 or (location or '').rstrip('/').endswith('/login'):
+            raise LoginError(f'Не удалось войти как {username} на {self.base_url}')
+
+
+def percentile(sorted_values, percent):
+    """Перцентиль по ближайшему рангу для заранее отсортированного списка"""
+    if not sorted_values:
+        return 0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, elapsed):
+    """Пропускная способность и перцентили задержки (в мс) по списку времен в секундах"""
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'error_rate': errors / len(values) * 100 if values else 0,
+        'rps': len(values) / elapsed if elapsed else 0,
+        'p50': percentile(values, 50) * 1000,
+        'p95': percentile(values, 95) * 1000,
+        'p99': percentile(values, 99) * 1000,
+        'max': values[-1] * 1000 if values else 0,
+    }
+
+def format_summary(name, result):
+    return (f'{name:<30} {result["requests"]:>7} {result["errors"]:>6} {result["error_rate"]:>6.1f}% '
+            f'{result["rps"]:>8.1f} {result["p50"]:>8.1f} {result["p95"]:>8.1f} {result["p99"]:>8.1f} {result["max"]:>8.1f}')
+
+SUMMARY_HEADER = (f'{"Маршрут":<30} {"Запросы":>7} {"Ошибки":>6} {"%":>7} '
+                  f'{"req/s":>8} {"p50, мс":>8} {"p95, мс":>8} {"p99, мс":>8} {"max, мс":>8}')
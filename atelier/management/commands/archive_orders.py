@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from atelier.archive import archivable_orders, archive_orders
+from atelier.db_router import replica_reads
+from atelier.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые завершенные и отмененные заказы в архивную таблицу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Возраст заказа в днях (по умолчанию ATELIER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, help='Размер пачки (по умолчанию ATELIER_ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать заказы для архивации')
+        parser.add_argument('--enqueue', action='store_true', help='Поставить архивацию в очередь фоновых задач')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            # Подсчет по всей таблице заказов - только чтение, его можно отдать реплике
+            with replica_reads():
+                count = archivable_orders(options['days']).count()
+            self.stdout.write(f'Будет перенесено в архив: {count}')
+            return
+        if options['enqueue']:
+            job = enqueue('archive_orders', {'days': options['days'], 'batch_size': options['batch_size']})
+            self.stdout.write(self.style.SUCCESS(f'Задача #{job.pk} поставлена в очередь'))
+            return
+        count = archive_orders(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив: {count}'))
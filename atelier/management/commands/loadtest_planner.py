@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.loadtest import SUMMARY_HEADER, LoginError, Session, format_summary, summarize
+from atelier.models import Order
+
+# Пары эндпоинтов: синхронный (WSGI) и асинхронный (ASGI) вариант
+ENDPOINTS = {
+    'sync': {
+        'check_day_limit': '/check-day-limit/',
+        'update_order_planning': '/update-order-planning/',
+    },
+    'async': {
+        'check_day_limit': '/api/check-day-limit/',
+        'update_order_planning': '/api/update-order-planning/',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест эндпоинтов планера: сравнение синхронного (WSGI) и асинхронного (ASGI) пути'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', help='Адрес WSGI-сервера, например http://127.0.0.1:8000')
+        parser.add_argument('--async-url', help='Адрес ASGI-сервера, например http://127.0.0.1:8001')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--concurrency', type=int, default=20, help='Количество параллельных клиентов')
+        parser.add_argument('--requests', type=int, default=500, help='Количество запросов на эндпоинт')
+
+    def handle(self, *args, **options):
+        targets = [(mode, options[f'{mode}_url']) for mode in ('sync', 'async') if options[f'{mode}_url']]
+        if not targets:
+            raise CommandError('Укажите --sync-url и/или --async-url')
+
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["username"]} не найден')
+        order = Order.objects.filter(user=user, planned_date__isnull=False).first()
+        if order is None:
+            raise CommandError('У пользователя нет запланированных заказов для теста')
+        payload = {'order_id': order.pk, 'planned_date': order.planned_date.isoformat(), 'order_in_day': 0}
+
+        results = {}
+        self.stdout.write(SUMMARY_HEADER)
+        for mode, base_url in targets:
+            try:
+                sessions = [Session(base_url, options['username'], options['password']) for _ in range(options['concurrency'])]
+            except LoginError as error:
+                raise CommandError(str(error))
+            for name, path in ENDPOINTS[mode].items():
+                results[(mode, name)] = self.run_endpoint(sessions, path, payload, options['requests'])
+                self.print_result(mode, name, results[(mode, name)])
+
+        if len(targets) == 2:
+            self.stdout.write('')
+            for name in ENDPOINTS['sync']:
+                sync_rps = results[('sync', name)]['rps']
+                async_rps = results[('async', name)]['rps']
+                ratio = async_rps / sync_rps if sync_rps else 0
+                self.stdout.write(f'{name}: async/sync = {ratio:.2f}x')
+
+    def run_endpoint(self, sessions, path, payload, total):
+        def worker(index):
+            session = sessions[index % len(sessions)]
+            started = time.perf_counter()
+            try:
+                status, body, location = session.post_json(path, payload)
+                ok = status == 200
+            except Exception:
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            outcomes = list(executor.map(worker, range(total)))
+        elapsed = time.perf_counter() - started
+
+        return summarize(
+            [latency for ok, latency in outcomes],
+            sum(1 for ok, latency in outcomes if not ok),
+            elapsed,
+        )
+
+    def print_result(self, mode, name, result):
+        self.stdout.write(format_summary(f'[{mode}] {name}', result))
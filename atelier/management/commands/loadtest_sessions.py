@@ -0,0 +1,172 @@
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from atelier.loadtest import SUMMARY_HEADER, LoginError, Session, format_summary, summarize
+from atelier.models import Customer, Order, OrderStatus, PlannerSettings
+
+# Вес действия в сценарии роли: сотрудники таскают карточки, владелец листает списки
+SCENARIOS = {
+    'staff': {'update_order_planning': 6, 'check_day_limit': 6, 'index': 2, 'order_create': 1},
+    'owner': {'index': 3, 'order_list': 2, 'customer_list': 2},
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест с параллельными сессиями: несколько сотрудников на пользователя переносят заказы '
+            'в планере, владелец листает списки. Сервер (runserver, gunicorn, uvicorn) должен работать с той же базой, '
+            'что и команда: тестовые пользователи создаются в ней и удаляются после теста')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', required=True, help='Адрес сервера, например http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=5, help='Количество тестовых пользователей (мастерских)')
+        parser.add_argument('--staff', type=int, default=3, help='Сессий сотрудников на пользователя')
+        parser.add_argument('--owners', type=int, default=1, help='Сессий владельца на пользователя')
+        parser.add_argument('--duration', type=float, default=30, help='Длительность теста, секунды')
+        parser.add_argument('--think-ms', type=int, default=0, help='Пауза между действиями сессии, мс')
+        parser.add_argument('--orders', type=int, default=30, help='Запланированных заказов на пользователя')
+        parser.add_argument('--days', type=int, default=5, help='На сколько дней вперед распределены заказы')
+        parser.add_argument('--seed', type=int, help='Зерно генератора случайных действий')
+        parser.add_argument('--keep-users', action='store_true', help='Не удалять тестовых пользователей')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        password = uuid.uuid4().hex
+        users = []
+        try:
+            for index in range(options['users']):
+                user = User.objects.create_user(username=f'load_{run_id}_{index}', password=password)
+                users.append(user)
+                self.create_data(user, options)
+            self.stdout.write(f'Создано пользователей: {len(users)} (load_{run_id}_*)')
+            self.run(users, password, options)
+        finally:
+            if options['keep_users']:
+                self.stdout.write(f'Пароль тестовых пользователей: {password}')
+            else:
+                User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def create_data(self, user, options):
+        status = OrderStatus.objects.create(user=user, name='Новый', color='#007bff')
+        PlannerSettings.objects.create(user=user, default_status=status)
+        customer = Customer.objects.create(user=user, first_name='Нагрузка', last_name='Тест', phone='+79990000000')
+        today = timezone.localdate()
+        days = [today + timedelta(days=i) for i in range(options['days'])]
+        Order.objects.bulk_create([
+            Order(user=user, customer=customer, status=status, title=f'Заказ {i}', price=1000,
+                  planned_minutes=60, planned_date=days[i % len(days)], order_in_day=i // len(days))
+            for i in range(options['orders'])
+        ])
+
+    def run(self, users, password, options):
+        sessions = []
+        for user_index, user in enumerate(users):
+            orders = {pk: version for pk, version in Order.objects.filter(user=user).values_list('id', 'version')}
+            roles = ['staff'] * options['staff'] + ['owner'] * options['owners']
+            for role in roles:
+                try:
+                    session = Session(options['url'], user.username, password)
+                except LoginError as error:
+                    raise CommandError(str(error))
+                # У каждого устройства свое представление о версиях заказов
+                sessions.append((user_index, role, session, dict(orders)))
+        if not sessions:
+            raise CommandError('Нет сессий: укажите --staff и/или --owners')
+        self.stdout.write(f'Сессий: {len(sessions)}, длительность {options["duration"]:g} с')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(1 << 30)
+        deadline = time.perf_counter() + options['duration']
+        results = [None] * len(sessions)
+
+        def worker(index):
+            results[index] = self.run_session(*sessions[index], options, random.Random(seed + index), deadline)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(sessions))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.report([record for records in results for record in records], elapsed)
+
+    def run_session(self, user_index, role, session, versions, options, rng, deadline):
+        """Выполняет действия роли до дедлайна; возвращает (маршрут, время, успех, конфликт)"""
+        actions = list(SCENARIOS[role])
+        weights = list(SCENARIOS[role].values())
+        today = timezone.localdate()
+        records = []
+        while time.perf_counter() < deadline:
+            action = rng.choices(actions, weights)[0]
+            order_id = rng.choice(list(versions))
+            planned_date = (today + timedelta(days=rng.randrange(options['days']))).isoformat()
+            conflict = False
+            started = time.perf_counter()
+            try:
+                if action == 'update_order_planning':
+                    status, body, location = session.post_json('/update-order-planning/', {
+                        'order_id': order_id,
+                        'planned_date': planned_date,
+                        'order_in_day': rng.randrange(options['orders'] // options['days'] + 1),
+                        'version': versions[order_id],
+                    })
+                    # Конфликт версий - штатный ответ при одновременных переносах, не ошибка
+                    conflict = status == 409
+                    ok = status in (200, 409)
+                    if ok:
+                        versions[order_id] = json.loads(body)['order']['version']
+                elif action == 'check_day_limit':
+                    status, body, location = session.post_json('/check-day-limit/', {
+                        'order_id': order_id,
+                        'planned_date': planned_date,
+                    })
+                    ok = status == 200
+                elif action == 'order_create':
+                    status, body, location = session.post_form('/orders/create/', {
+                        'title': 'Нагрузочный заказ',
+                        'price': '1500',
+                        'planned_minutes': '30',
+                        'customer_first_name': 'Клиент',
+                        # Часть телефонов повторяется: форма находит существующего клиента
+                        'customer_phone': f'+7998{user_index:03d}{rng.randrange(50):04d}',
+                        'planned_date': planned_date,
+                    })
+                    # Успешное создание - редирект на планер, а не повторный показ формы
+                    ok = status == 302 and not (location or '').rstrip('/').endswith('/login')
+                else:
+                    path = {'index': '/', 'order_list': '/orders/', 'customer_list': '/customers/'}[action]
+                    status, body, location = session.get(path)
+                    ok = status == 200
+            except Exception:
+                ok = False
+            records.append((action, time.perf_counter() - started, ok, conflict))
+            if options['think_ms']:
+                time.sleep(options['think_ms'] / 1000)
+        return records
+
+    def report(self, records, elapsed):
+        by_route = defaultdict(list)
+        for route, latency, ok, conflict in records:
+            by_route[route].append((latency, ok, conflict))
+
+        self.stdout.write('')
+        self.stdout.write(SUMMARY_HEADER)
+        for route in sorted(by_route):
+            rows = by_route[route]
+            errors = sum(1 for latency, ok, conflict in rows if not ok)
+            self.stdout.write(format_summary(route, summarize([row[0] for row in rows], errors, elapsed)))
+        errors = sum(1 for route, latency, ok, conflict in records if not ok)
+        self.stdout.write(format_summary('Всего', summarize([record[1] for record in records], errors, elapsed)))
+
+        conflicts = sum(1 for route, latency, ok, conflict in records if conflict)
+        if conflicts:
+            self.stdout.write(f'Конфликтов версий при переносе (409): {conflicts}')
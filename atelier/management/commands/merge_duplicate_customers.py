@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.customer_merge import describe_customer, find_duplicate_customers, merge_customers
+
+
+class Command(BaseCommand):
+    help = ('Объединяет клиентов одного пользователя с одинаковым телефоном (после миграции 0012 '
+            'у дублей phone_normalized пустой): заказы переходят к самому раннему клиенту, '
+            'данные дублей дописываются в его комментарий')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Имя пользователя (по умолчанию все)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, кто будет объединен')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["user"]} не найден')
+
+        duplicates = find_duplicate_customers(user)
+        merged = moved = 0
+        for keeper, customers in duplicates.items():
+            if customers:
+                self.stdout.write(f'{describe_customer(keeper)} <- ' + '; '.join(describe_customer(c) for c in customers))
+            if not options['dry_run']:
+                moved += merge_customers(keeper, customers)
+            merged += len(customers)
+
+        if options['dry_run']:
+            self.stdout.write(f'Будет объединено дублей: {merged}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Объединено дублей: {merged}, перенесено заказов: {moved}'))
@@ -0,0 +1,79 @@
+import csv
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from atelier.models import PlannerSettings
+from atelier.provisioning import DEFAULT_PROVISION_BATCH_SIZE, get_tenant_template, get_tenant_templates, provision_users
+
+
+class Command(BaseCommand):
+    help = ('Массовая подготовка аккаунтов: создает пользователей из CSV (username,email,password) '
+            'и/или досоздает настройки, статусы и категории аккаунтам, у которых их нет')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', help='CSV с заголовком username,email[,password]; без пароля вход по паролю закрыт')
+        parser.add_argument('--missing', action='store_true', help='Подготовить существующие аккаунты без настроек планера')
+        parser.add_argument('--template', help=f'Шаблон аккаунта: {", ".join(get_tenant_templates())}')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_PROVISION_BATCH_SIZE,
+                            help='Аккаунтов в одной транзакции')
+
+    def handle(self, *args, **options):
+        if not options['csv'] and not options['missing']:
+            raise CommandError('Укажите --csv и/или --missing')
+        try:
+            get_tenant_template(options['template'])
+        except LookupError as error:
+            raise CommandError(str(error))
+
+        if options['csv']:
+            created = self.create_from_csv(options['csv'], options['template'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Создано аккаунтов: {created}'))
+        if options['missing']:
+            provisioned = self.provision_missing(options['template'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Подготовлено существующих аккаунтов: {provisioned}'))
+
+    def read_rows(self, path):
+        with open(path, newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            if 'username' not in (reader.fieldnames or []):
+                raise CommandError('В CSV нет колонки username')
+            rows = [row for row in reader if row.get('username')]
+        if len({row['username'] for row in rows}) != len(rows):
+            raise CommandError('В CSV повторяются username')
+        return rows
+
+    def create_from_csv(self, path, template, batch_size):
+        rows = self.read_rows(path)
+        existing = set(User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', flat=True))
+        for username in sorted(existing):
+            self.stderr.write(f'Пропущен {username}: пользователь уже есть')
+        rows = [row for row in rows if row['username'] not in existing]
+
+        created = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Пачка пользователей и их настройки - одна транзакция: без полуготовых аккаунтов
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username=row['username'], email=row.get('email') or '',
+                         password=make_password(row.get('password') or None))
+                    for row in batch
+                ])
+                # MySQL не возвращает id из bulk_create, поэтому перечитываем
+                users = User.objects.filter(username__in=[row['username'] for row in batch]).only('id')
+                provision_users(users, template)
+            created += len(batch)
+        return created
+
+    def provision_missing(self, template, batch_size):
+        ids = list(User.objects
+                   .exclude(pk__in=PlannerSettings.objects.values('user_id'))
+                   .order_by('pk')
+                   .values_list('pk', flat=True))
+        provisioned = 0
+        for start in range(0, len(ids), batch_size):
+            provisioned += provision_users(User.objects.filter(pk__in=ids[start:start + batch_size]).only('id'), template)
+        return provisioned
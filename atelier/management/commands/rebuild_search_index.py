@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from atelier.jobs import enqueue
+from atelier.models import SearchTerm
+from atelier.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс заказов и клиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Только для указанного пользователя')
+        parser.add_argument('--enqueue', action='store_true', help='Поставить переиндексацию в очередь фоновых задач')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {options["username"]} не найден')
+        if options['enqueue']:
+            job = enqueue('rebuild_search_index', {'user_id': user.pk if user else None})
+            self.stdout.write(self.style.SUCCESS(f'Задача #{job.pk} поставлена в очередь'))
+            return
+        rebuild_index(user)
+        terms = SearchTerm.objects.filter(user=user) if user else SearchTerm.objects.all()
+        self.stdout.write(self.style.SUCCESS(f'Индекс перестроен: {terms.count()} термов'))
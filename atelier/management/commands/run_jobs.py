@@ -0,0 +1,66 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from atelier.db_router import replica_reads
+from atelier.jobs import claim_next_job, job_stats, prune_finished_jobs, requeue_stale_jobs, run_job
+
+# Как часто воркер ищет брошенные задачи и чистит старые, секунды
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: выполняет задачи из очереди по одной'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить все готовые задачи и выйти')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Пауза при пустой очереди, секунды')
+        parser.add_argument('--max-jobs', type=int, help='Выйти после указанного числа задач')
+        parser.add_argument('--stats', action='store_true', help='Показать статистику задач и выйти')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.show_stats()
+            return
+
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        processed = 0
+        next_maintenance = 0
+        self.stdout.write(f'Воркер {worker_id} запущен')
+        try:
+            while options['max_jobs'] is None or processed < options['max_jobs']:
+                # Долгоживущий процесс: переподключаемся так же, как между запросами
+                close_old_connections()
+                if time.monotonic() >= next_maintenance:
+                    requeue_stale_jobs()
+                    prune_finished_jobs()
+                    next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                job = run_job(job)
+                processed += 1
+                message = f'{job.name} #{job.pk}: {job.get_status_display()} за {job.duration_ms} мс'
+                if job.status == job.STATUS_DONE:
+                    self.stdout.write(message)
+                else:
+                    self.stderr.write(f'{message}\n{job.last_error}')
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Выполнено задач: {processed}')
+
+    def show_stats(self):
+        with replica_reads():
+            rows = list(job_stats())
+        for row in rows:
+            avg_ms = round(row['avg_ms']) if row['avg_ms'] is not None else '-'
+            max_ms = row['max_ms'] if row['max_ms'] is not None else '-'
+            self.stdout.write(f"{row['name']:<25} {row['status']:<10} {row['count']:>6}  среднее {avg_ms} мс, максимум {max_ms} мс")
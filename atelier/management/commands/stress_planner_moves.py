@@ -0,0 +1,113 @@
+import random
+import threading
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from atelier.models import Customer, Order, PlannerSettings
+from atelier.planning import OrderVersionConflict, move_order
+
+
+class Command(BaseCommand):
+    help = ('Стресс-тест переносов в планере: параллельные "перетаскивания" одних и тех же заказов. '
+            'Проверяет, что порядок в днях не дублируется и ни одно изменение не потеряно')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Количество параллельных клиентов')
+        parser.add_argument('--moves', type=int, default=100, help='Переносов на клиента')
+        parser.add_argument('--orders', type=int, default=12, help='Количество заказов')
+        parser.add_argument('--days', type=int, default=2, help='Количество дней, между которыми переносятся заказы')
+
+    def handle(self, *args, **options):
+        # Отдельный временный пользователь, чтобы не трогать реальные данные
+        user = User.objects.create_user(username=f'stress_{uuid.uuid4().hex[:12]}')
+        try:
+            self.run(user, options)
+        finally:
+            user.delete()
+
+    def run(self, user, options):
+        PlannerSettings.objects.create(user=user)
+        customer = Customer.objects.create(user=user, first_name='Stress', last_name='Test', phone='+70000000000')
+        first_day = timezone.localdate() + timedelta(days=1)
+        days = [first_day + timedelta(days=i) for i in range(options['days'])]
+        orders = [
+            Order.objects.create(user=user, customer=customer, title=f'Stress {i}', price=0,
+                                 planned_date=days[i % len(days)], order_in_day=i // len(days))
+            for i in range(options['orders'])
+        ]
+        order_ids = [order.pk for order in orders]
+
+        successes = []
+        stats = Counter()
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            # Версии, которые "видит" этот клиент
+            known = dict(Order.objects.filter(pk__in=order_ids).values_list('id', 'version'))
+            try:
+                for _ in range(options['moves']):
+                    order_id = rng.choice(order_ids)
+                    day = rng.choice(days + [None])
+                    position = rng.randint(0, len(order_ids)) if day else None
+                    try:
+                        versions, _ = move_order(user, order_id, day, position, known[order_id])
+                    except OrderVersionConflict:
+                        # Как клиент после ответа 409: берет актуальную версию
+                        known[order_id] = Order.objects.values_list('version', flat=True).get(pk=order_id)
+                        with lock:
+                            stats['conflicts'] += 1
+                        continue
+                    except OperationalError:
+                        # SQLite отвечает "database is locked" при конкурентной записи
+                        with lock:
+                            stats['retries'] += 1
+                        continue
+                    # Перенумерованные соседи тоже получили новые версии
+                    known.update(versions)
+                    with lock:
+                        stats['moves'] += 1
+                        # Версии соседей тоже выданы этим переносом, но их дату он не менял
+                        successes.extend((pk, version, day, pk == order_id) for pk, version in versions.items())
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            list(executor.map(worker, range(options['workers'])))
+
+        errors = self.verify(user, days, successes)
+        self.stdout.write(
+            f"Успешных переносов: {stats['moves']}, конфликтов версий: {stats['conflicts']}, "
+            f"повторов из-за блокировок БД: {stats['retries']}"
+        )
+        if errors:
+            raise CommandError('Проверка не пройдена:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Потерянных изменений и дублей order_in_day нет'))
+
+    def verify(self, user, days, successes):
+        errors = []
+        for day in days:
+            positions = sorted(Order.objects.filter(user=user, planned_date=day).values_list('order_in_day', flat=True))
+            if positions != list(range(len(positions))):
+                errors.append(f'{day}: порядок в дне {positions} вместо 0..{len(positions) - 1}')
+
+        by_order = defaultdict(list)
+        for order_id, version, day, moved in successes:
+            by_order[order_id].append((version, day, moved))
+        for order_id, version, planned_date in Order.objects.filter(user=user).values_list('id', 'version', 'planned_date'):
+            changes = sorted(by_order[order_id], key=lambda change: change[0])
+            moves = [change for change in changes if change[2]]
+            # Каждая версия выдана ровно одному изменению: два клиента не перезаписали друг друга.
+            # Перенос с перенумерацией может поднять версию перенесенного заказа дважды
+            if len({change[0] for change in changes}) != len(changes) or (changes[-1][0] if changes else 1) != version:
+                errors.append(f'Заказ {order_id}: версия {version}, успешные изменения {[change[0] for change in changes]}')
+            elif moves and moves[-1][1] != planned_date:
+                errors.append(f'Заказ {order_id}: дата {planned_date}, последний перенос на {moves[-1][1]}')
+        return errors
@@ -1,19 +1,83 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.shortcuts import redirect
-from django.urls import reverse
+from django.urls import Resolver404, resolve, reverse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+def public_view(view_func):
+    """Помечает представление доступным без входа в аккаунт (доступ проверяет само представление)"""
+    view_func.public = True
+    return view_func
+
 
 class AuthenticationMiddleware:
+    # Работает в обоих режимах: под ASGI асинхронные представления (/api/*)
+    # не переводятся в поток ради одной проверки входа
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
+    def is_public(self, request):
         # Пути, которые доступны без аутентификации
         public_paths = [
             reverse('login'),
             reverse('register'),
         ]
+        if request.path in public_paths:
+            return True
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return getattr(match.func, 'public', False)
 
-        if not request.user.is_authenticated and request.path not in public_paths:
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not request.user.is_authenticated and not self.is_public(request):
             return redirect('login')
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if not user.is_authenticated and not self.is_public(request):
+            return redirect('login')
+        return await self.get_response(request)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, который не переводит в поток запросы к представлениям.
+
+    WhiteNoiseMiddleware 6.x только синхронный: одно такое звено заставляет Django
+    оборачивать всю цепочку. В потоке выполняется только отдача самих статических файлов.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # При автообновлении файл ищется на диске
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,151 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+OWNED_MODELS = ('Customer', 'Order', 'OrderStatus', 'PlannerSettings')
+
+
+def copy_planned_hours(apps, schema_editor):
+    Order = apps.get_model('atelier', 'Order')
+    Order.objects.update(planned_minutes=F('planned_hours') * 60)
+
+
+def copy_planned_minutes(apps, schema_editor):
+    Order = apps.get_model('atelier', 'Order')
+    for order in Order.objects.only('id', 'planned_minutes').iterator():
+        Order.objects.filter(pk=order.pk).update(planned_hours=max(1, -(-order.planned_minutes // 60)))
+
+
+def assign_owner(apps, schema_editor):
+    """До этой миграции приложение было однопользовательским: все данные
+    передаются первому суперпользователю (или первому пользователю)"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    models_to_fill = [apps.get_model('atelier', name) for name in OWNED_MODELS]
+    if not any(model.objects.filter(user__isnull=True).exists() for model in models_to_fill):
+        return
+    owner = User.objects.order_by('-is_superuser', 'id').first()
+    if owner is None:
+        raise RuntimeError(
+            'В базе есть заказы без владельца, но нет ни одного пользователя. '
+            'Создайте пользователя (manage.py createsuperuser) и повторите migrate'
+        )
+
+    PlannerSettings = apps.get_model('atelier', 'PlannerSettings')
+    # Настройки - одна запись на пользователя; лишние записи однопользовательской версии не нужны
+    keep = PlannerSettings.objects.filter(user__isnull=True).order_by('id').first()
+    if keep and not PlannerSettings.objects.filter(user=owner).exists():
+        PlannerSettings.objects.filter(user__isnull=True).exclude(pk=keep.pk).delete()
+    else:
+        PlannerSettings.objects.filter(user__isnull=True).delete()
+
+    OrderStatus = apps.get_model('atelier', 'OrderStatus')
+    # Названия статусов становятся уникальными в пределах пользователя
+    taken = set(OrderStatus.objects.filter(user=owner).values_list('name', flat=True))
+    for status in OrderStatus.objects.filter(user__isnull=True).order_by('id'):
+        name, number = status.name, 2
+        while name in taken:
+            name = f'{status.name[:95]} ({number})'
+            number += 1
+        taken.add(name)
+        if name != status.name:
+            OrderStatus.objects.filter(pk=status.pk).update(name=name)
+
+    for model in models_to_fill:
+        model.objects.filter(user__isnull=True).update(user=owner)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0002_orderstatus_plannersettings_order_color_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='planned_minutes',
+            field=models.PositiveIntegerField(default=60, verbose_name='Планируемые минуты'),
+        ),
+        # Длительность в часах переводится в минуты до удаления старого поля
+        migrations.RunPython(copy_planned_hours, copy_planned_minutes),
+        migrations.RemoveField(
+            model_name='order',
+            name='planned_hours',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='order_in_day',
+            field=models.PositiveIntegerField(blank=True, default=None, null=True, verbose_name='Порядковый номер в дне'),
+        ),
+        # Владелец добавляется в три шага: NULL-колонка, заполнение, NOT NULL
+        migrations.AddField(
+            model_name='customer',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='orderstatus',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='plannersettings',
+            name='user',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.RunPython(assign_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customer',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='orderstatus',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='plannersettings',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderstatus',
+            unique_together={('user', 'name')},
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название категории')),
+                ('default_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена по умолчанию')),
+                ('color', models.CharField(default='#007bff', max_length=7, verbose_name='Цвет')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Категория',
+                'verbose_name_plural': 'Категории',
+                'unique_together': {('user', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='atelier.category', verbose_name='Категория'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_default_status(apps, schema_editor):
+    OrderStatus = apps.get_model('atelier', 'OrderStatus')
+    PlannerSettings = apps.get_model('atelier', 'PlannerSettings')
+    for status in OrderStatus.objects.filter(is_default=True).order_by('user_id', 'id'):
+        settings, created = PlannerSettings.objects.get_or_create(user_id=status.user_id)
+        if settings.default_status_id is None:
+            settings.default_status = status
+            settings.save(update_fields=['default_status'])
+
+
+def copy_is_default(apps, schema_editor):
+    OrderStatus = apps.get_model('atelier', 'OrderStatus')
+    PlannerSettings = apps.get_model('atelier', 'PlannerSettings')
+    status_ids = PlannerSettings.objects.filter(default_status__isnull=False).values_list('default_status_id', flat=True)
+    OrderStatus.objects.filter(id__in=list(status_ids)).update(is_default=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0003_remove_order_planned_hours_customer_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plannersettings',
+            name='default_status',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='default_for', to='atelier.orderstatus', verbose_name='Статус по умолчанию'),
+        ),
+        migrations.RunPython(copy_default_status, copy_is_default),
+        migrations.RemoveField(
+            model_name='orderstatus',
+            name='is_default',
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0004_plannersettings_default_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True, verbose_name='Дата повторения'),
+        ),
+        migrations.CreateModel(
+            name='RecurringOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Название заказа')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='Комментарий')),
+                ('planned_minutes', models.PositiveIntegerField(default=60, verbose_name='Планируемые минуты')),
+                ('color', models.CharField(default='#007bff', max_length=7, verbose_name='Цвет в планере')),
+                ('interval_work_days', models.PositiveIntegerField(default=5, help_text='Заказ повторяется каждые N рабочих дней из настроек планера', verbose_name='Интервал (рабочих дней)')),
+                ('start_date', models.DateField(verbose_name='Дата начала')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Дата окончания')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='atelier.category', verbose_name='Категория')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_orders', to='atelier.customer', verbose_name='Заказчик')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Повторяющийся заказ',
+                'verbose_name_plural': 'Повторяющиеся заказы',
+                'ordering': ['start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='recurring_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='atelier.recurringorder', verbose_name='Повторяющийся заказ'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='order',
+            unique_together={('recurring_order', 'occurrence_date')},
+        ),
+        migrations.CreateModel(
+            name='RecurringOrderSkip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата повторения')),
+                ('recurring_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skips', to='atelier.recurringorder', verbose_name='Повторяющийся заказ')),
+            ],
+            options={
+                'verbose_name': 'Пропуск повторения',
+                'verbose_name_plural': 'Пропуски повторений',
+                'unique_together': {('recurring_order', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-19 16:58
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_planned_end_time(apps, schema_editor):
+    Order = apps.get_model('atelier', 'Order')
+    for order in Order.objects.filter(planned_start_time__isnull=False).only('planned_start_time', 'planned_minutes'):
+        end = min(order.planned_start_time.hour * 60 + order.planned_start_time.minute + order.planned_minutes, 24 * 60 - 1)
+        order.planned_end_time = datetime.time(end // 60, end % 60)
+        order.save(update_fields=['planned_end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0005_recurringorder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='planned_end_time',
+            field=models.TimeField(blank=True, editable=False, null=True, verbose_name='Время окончания'),
+        ),
+        migrations.AddField(
+            model_name='plannersettings',
+            name='day_start_time',
+            field=models.TimeField(default=datetime.time(9, 0), verbose_name='Начало рабочего дня'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'planned_date', 'planned_start_time'], name='order_day_slot_idx'),
+        ),
+        migrations.RunPython(fill_planned_end_time, migrations.RunPython.noop),
+    ]
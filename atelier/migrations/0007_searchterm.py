@@ -0,0 +1,92 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:00
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия токенизатора atelier.search на момент миграции: миграция не должна
+# меняться вместе с модулем поиска
+TERM_MAX_LENGTH = 50
+WORD_RE = re.compile(r'\w+')
+ORDER_FIELDS = (('title', 3), ('comment', 1))
+CUSTOMER_FIELDS = (('last_name', 3), ('first_name', 3), ('comment', 1))
+PHONE_WEIGHT = 2
+BATCH_SIZE = 1000
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = text.lower().replace('ё', 'е')
+    return [word[:TERM_MAX_LENGTH] for word in WORD_RE.findall(text) if len(word) > 1]
+
+def phone_terms(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    terms = {digits}
+    if len(digits) > 10:
+        terms.add(digits[-10:])
+    return list(terms)
+
+
+def build_index(apps, schema_editor):
+    Order = apps.get_model('atelier', 'Order')
+    Customer = apps.get_model('atelier', 'Customer')
+    SearchTerm = apps.get_model('atelier', 'SearchTerm')
+
+    # Пачки по BATCH_SIZE, как в rebuild_index: весь индекс в памяти не держится
+    batch = []
+    for order in Order.objects.only('id', 'user_id', 'title', 'comment').iterator():
+        weights = {}
+        for field, weight in ORDER_FIELDS:
+            for term in tokenize(getattr(order, field)):
+                weights[term] = weights.get(term, 0) + weight
+        batch += [SearchTerm(user_id=order.user_id, order_id=order.pk, term=term, weight=weight)
+                  for term, weight in weights.items()]
+        if len(batch) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    for customer in Customer.objects.only('id', 'user_id', 'first_name', 'last_name', 'phone', 'comment').iterator():
+        weights = {}
+        for field, weight in CUSTOMER_FIELDS:
+            for term in tokenize(getattr(customer, field)):
+                weights[term] = weights.get(term, 0) + weight
+        for term in phone_terms(customer.phone):
+            weights[term] = weights.get(term, 0) + PHONE_WEIGHT
+        batch += [SearchTerm(user_id=customer.user_id, customer_id=customer.pk, term=term, weight=weight)
+                  for term, weight in weights.items()]
+        if len(batch) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0006_order_planned_end_time'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50, verbose_name='Слово')),
+                ('weight', models.PositiveSmallIntegerField(default=1, verbose_name='Вес')),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='atelier.customer')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='atelier.order')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Поисковый терм',
+                'verbose_name_plural': 'Поисковые термы',
+                'indexes': [models.Index(fields=['user', 'term'], name='search_user_term_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
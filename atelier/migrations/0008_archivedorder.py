@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_final_statuses(apps, schema_editor):
+    # Статусы, которые создавались при регистрации для завершенных и отмененных заказов
+    OrderStatus = apps.get_model('atelier', 'OrderStatus')
+    OrderStatus.objects.filter(name__in=['Завершен', 'Отменен']).update(is_final=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0007_searchterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderstatus',
+            name='is_final',
+            field=models.BooleanField(default=False, help_text='Заказы в этом статусе со временем переносятся в архив', verbose_name='Завершающий статус'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('title', models.CharField(max_length=200, verbose_name='Название заказа')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='Комментарий')),
+                ('planned_date', models.DateField(blank=True, null=True, verbose_name='Планируемая дата')),
+                ('planned_minutes', models.PositiveIntegerField(default=60, verbose_name='Планируемые минуты')),
+                ('planned_start_time', models.TimeField(blank=True, null=True, verbose_name='Время начала')),
+                ('planned_end_time', models.TimeField(blank=True, null=True, verbose_name='Время окончания')),
+                ('color', models.CharField(default='#007bff', max_length=7, verbose_name='Цвет в планере')),
+                ('order_in_day', models.PositiveIntegerField(blank=True, null=True, verbose_name='Порядковый номер в дне')),
+                ('occurrence_date', models.DateField(blank=True, null=True, verbose_name='Дата повторения')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='atelier.category', verbose_name='Категория')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to='atelier.customer', verbose_name='Заказчик')),
+                ('recurring_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='atelier.recurringorder', verbose_name='Повторяющийся заказ')),
+                ('status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='atelier.orderstatus', verbose_name='Статус')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архивные заказы',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(mark_final_statuses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:17
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_phone(phone):
+    # Копия atelier.models.normalize_phone на момент миграции: миграция не должна
+    # меняться вместе с моделями
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10 and digits.startswith('9'):
+        digits = '7' + digits
+    return digits
+
+
+def backfill_phone_normalized(apps, schema_editor):
+    """Заполняет нормализованный телефон.
+
+    Дубли (тот же пользователь и те же цифры телефона) не сливаются: у самого раннего
+    клиента телефон заполняется, у остальных остается NULL. Слияние с сохранением
+    имен и комментариев - команда merge_duplicate_customers.
+    """
+    Customer = apps.get_model('atelier', 'Customer')
+
+    keepers = set()
+    for customer in Customer.objects.order_by('id').only('id', 'user_id', 'phone').iterator():
+        normalized = normalize_phone(customer.phone)
+        if not normalized:
+            # Телефон без цифр не позволяет понять, один ли это клиент: остается NULL
+            continue
+        key = (customer.user_id, normalized)
+        if key not in keepers:
+            keepers.add(key)
+            Customer.objects.filter(id=customer.id).update(phone_normalized=normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0011_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(default=None, editable=False, max_length=17, null=True, verbose_name='Телефон (цифры)'),
+        ),
+        migrations.RunPython(backfill_phone_normalized, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(fields=('user', 'phone_normalized'), name='customer_user_phone_unique'),
+        ),
+    ]
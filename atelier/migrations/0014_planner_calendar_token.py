@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0013_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plannersettings',
+            name='calendar_token',
+            field=models.CharField(blank=True, editable=False, max_length=43, null=True, unique=True, verbose_name='Токен календаря'),
+        ),
+    ]
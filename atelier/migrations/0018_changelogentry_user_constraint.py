@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_orphan_entries(apps, schema_editor):
+    """Удаляет записи журнала удаленных пользователей: без этого ограничение не создать"""
+    ChangeLogEntry = apps.get_model('atelier', 'ChangeLogEntry')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    ChangeLogEntry.objects.exclude(user_id__in=User.objects.values('id')).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0017_archivedorder_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_orphan_entries, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='changelogentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
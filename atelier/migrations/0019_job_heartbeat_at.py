@@ -0,0 +1,25 @@
+# Generated by Django 5.0.4 on 2026-10-19 17:54
+
+from django.db import migrations, models
+
+
+def copy_started_at(apps, schema_editor):
+    """Выполняющимся задачам сигналом служит время запуска, как до появления heartbeat_at"""
+    Job = apps.get_model('atelier', 'Job')
+    Job.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atelier', '0018_changelogentry_user_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний сигнал воркера'),
+        ),
+        migrations.RunPython(copy_started_at, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,27 @@
+from datetime import time, timedelta
+import re
+import secrets
 from django.db import models
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.core.validators import RegexValidator
+from django.utils import timezone
 import random
 from django.contrib.auth.models import User
+from .scheduling import minutes_to_time, time_to_minutes
+
+PLANNER_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#F9A826', '#6A0572',
+                  '#AB83A1', '#5C80BC', '#4CB944', '#E2B1B1', '#7D70BA']
 
 class OrderStatus(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
     name = models.CharField(max_length=100, verbose_name="Название статуса")
     color = models.CharField(max_length=7, default='#007bff', verbose_name="Цвет")
-    is_default = models.BooleanField(default=False, verbose_name="Статус по умолчанию")
+    is_final = models.BooleanField(
+        default=False,
+        verbose_name="Завершающий статус",
+        help_text="Заказы в этом статусе со временем переносятся в архив"
+    )
 
     class Meta:
         verbose_name = "Статус заказа"
@@ -17,6 +31,44 @@ class OrderStatus(models.Model):
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+def normalize_phone(phone):
+    """Только цифры, российские номера приводятся к виду 7XXXXXXXXXX: +7 999..., 8999... и 999... совпадут"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10 and digits.startswith('9'):
+        digits = '7' + digits
+    return digits
+
+def customer_subquery(model, aggregate, *conditions, **filters):
+    """Агрегат по заказам клиента подзапросом: без JOIN, который размножил бы строки"""
+    rows = (model.objects
+            .filter(*conditions, customer=OuterRef('pk'), **filters)
+            .order_by()
+            .values('customer')
+            .annotate(value=aggregate)
+            .values('value'))
+    return Subquery(rows)
+
+class CustomerQuerySet(models.QuerySet):
+    def with_order_stats(self):
+        """Число заказов (включая архив), открытых заказов, дата последнего заказа и сумма заказов"""
+        # Архивные заказы всегда в завершающих статусах, поэтому открытые считаются только по Order
+        last_order = customer_subquery(Order, Max('created_at'))
+        last_archived = customer_subquery(ArchivedOrder, Max('created_at'))
+        return self.annotate(
+            order_count=(Coalesce(customer_subquery(Order, Count('pk')), 0)
+                         + Coalesce(customer_subquery(ArchivedOrder, Count('pk')), 0)),
+            open_order_count=Coalesce(
+                customer_subquery(Order, Count('pk'), Q(status__isnull=True) | Q(status__is_final=False)),
+                0,
+            ),
+            # В MySQL и SQLite GREATEST возвращает NULL, если хотя бы один аргумент NULL
+            last_order_at=Coalesce(Greatest(last_order, last_archived), last_order, last_archived),
+            revenue=(Coalesce(customer_subquery(Order, Sum('price')), 0, output_field=models.DecimalField())
+                     + Coalesce(customer_subquery(ArchivedOrder, Sum('price')), 0, output_field=models.DecimalField())),
+        )
+
 class Customer(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
     first_name = models.CharField(max_length=100, verbose_name="Имя")
@@ -31,16 +83,35 @@ class Customer(models.Model):
         verbose_name="Телефон"
     )
     comment = models.TextField(blank=True, null=True, verbose_name="Комментарий")
+    # Нормализованный телефон для поиска клиента: один индексный поиск без дублей.
+    # NULL для телефона без цифр: такие клиенты не считаются дублями друг друга
+    phone_normalized = models.CharField(max_length=17, null=True, default=None, editable=False, verbose_name="Телефон (цифры)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
 
+    objects = CustomerQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Заказчик"
         verbose_name_plural = "Заказчики"
         ordering = ['-created_at']
+        indexes = [
+            # Сортировка и поиск по префиксу в админке
+            models.Index(fields=['created_at'], name='customer_created_idx'),
+            models.Index(fields=['last_name'], name='customer_last_name_idx'),
+            models.Index(fields=['first_name'], name='customer_first_name_idx'),
+            models.Index(fields=['phone'], name='customer_phone_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'phone_normalized'], name='customer_user_phone_unique'),
+        ]
 
     def __str__(self):
         return f"{self.last_name} {self.first_name} ({self.phone}) - {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        self.phone_normalized = normalize_phone(self.phone) or None
+        super().save(*args, **kwargs)
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
     name = models.CharField(max_length=100, verbose_name="Название категории")
@@ -59,6 +130,14 @@ class Category(models.Model):
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+class OrderVersionConflict(Exception):
+    """Заказ изменился с тех пор, как клиент получил его версию"""
+
+    def __init__(self, order_id):
+        super().__init__(f'Order {order_id} was changed by another client')
+        self.order_id = order_id
+
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
     title = models.CharField(max_length=200, verbose_name="Название заказа")
@@ -91,6 +170,8 @@ class Order(models.Model):
     planned_date = models.DateField(null=True, blank=True, verbose_name="Планируемая дата")
     planned_minutes = models.PositiveIntegerField(default=60, verbose_name="Планируемые минуты")
     planned_start_time = models.TimeField(null=True, blank=True, verbose_name="Время начала")
+    # Денормализованный конец слота, чтобы проверка пересечений шла по индексу
+    planned_end_time = models.TimeField(null=True, blank=True, editable=False, verbose_name="Время окончания")
     color = models.CharField(max_length=7, default='#007bff', verbose_name="Цвет в планере")
     order_in_day = models.PositiveIntegerField(
         null=True,
@@ -98,6 +179,17 @@ class Order(models.Model):
         verbose_name="Порядковый номер в дне",
         default=None
     )    
+    recurring_order = models.ForeignKey(
+        'RecurringOrder',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        verbose_name="Повторяющийся заказ"
+    )
+    occurrence_date = models.DateField(null=True, blank=True, verbose_name="Дата повторения")
+    # Версия для оптимистичной блокировки: растет при каждом изменении заказа
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Версия")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
@@ -105,23 +197,76 @@ class Order(models.Model):
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
         ordering = ['-created_at']
+        unique_together = ['recurring_order', 'occurrence_date']  # Повторение материализуется один раз
+        indexes = [
+            models.Index(fields=['user', 'planned_date', 'planned_start_time'], name='order_day_slot_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['title'], name='order_title_idx'),
+        ]
+
+    is_archived = False
 
     def __str__(self):
         return f"{self.title} ({self.user.username})"
 
     def save(self, *args, **kwargs):
-        if not self.status:
+        if not self.status_id:
             # Устанавливаем статус по умолчанию для текущего пользователя
-            default_status = OrderStatus.objects.filter(user=self.user, is_default=True).first()
-            if default_status:
-                self.status = default_status
+            self.status_id = PlannerSettings.get_default_status_id(self.user_id)
         
         if not self.color or self.color == '#007bff':
-            colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#F9A826', '#6A0572', 
-                     '#AB83A1', '#5C80BC', '#4CB944', '#E2B1B1', '#7D70BA']
-            self.color = random.choice(colors)
+            self.color = random.choice(PLANNER_COLORS)
         
-        super().save(*args, **kwargs)
+        if self.planned_start_time:
+            self.planned_end_time = minutes_to_time(time_to_minutes(self.planned_start_time) + self.planned_minutes)
+        else:
+            self.planned_end_time = None
+        
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        
+        # Версия, с которой экземпляр был прочитан: UPDATE пройдет, только если
+        # заказ с тех пор не менял никто другой (см. _do_update)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        self._expected_version = self.version
+        self.version += 1
+        try:
+            super().save(*args, **kwargs)
+        except OrderVersionConflict:
+            self.version = self._expected_version
+            raise
+        finally:
+            del self._expected_version
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_version = getattr(self, '_expected_version', None)
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        updated = super()._do_update(
+            base_qs.filter(version=expected_version), using, pk_val, values, update_fields, forced_update
+        )
+        # Без этой проверки Django выполнил бы INSERT поверх существующей строки
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise OrderVersionConflict(pk_val)
+        return updated
+
+    @classmethod
+    def slot_conflicts(cls, user, planned_date, start_time, minutes, exclude_pk=None):
+        """Заказы дня, пересекающиеся со слотом. Не загружает весь день:
+        условие start < конец слота AND end > начало слота идет по индексу."""
+        end_time = minutes_to_time(time_to_minutes(start_time) + minutes)
+        conflicts = cls.objects.filter(
+            user=user,
+            planned_date=planned_date,
+            planned_start_time__lt=end_time,
+            planned_end_time__gt=start_time,
+        )
+        if exclude_pk is not None:
+            conflicts = conflicts.exclude(pk=exclude_pk)
+        return conflicts
 
 class PlannerSettings(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="Пользователь")
@@ -132,10 +277,388 @@ class PlannerSettings(models.Model):
         verbose_name="Рабочие дни (1-ПН,7-ВС)",
         help_text="Через запятую, где 1 - понедельник, 7 - воскресенье"
     )
+    day_start_time = models.TimeField(default=time(9, 0), verbose_name="Начало рабочего дня")
+    # OneToOne гарантирует на уровне БД, что статус может быть
+    # статусом по умолчанию не более чем у одного пользователя
+    default_status = models.OneToOneField(
+        OrderStatus,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='default_for',
+        verbose_name="Статус по умолчанию"
+    )
+    # Секрет в ссылке на календарную подписку (.ics): календари не умеют входить в аккаунт
+    calendar_token = models.CharField(
+        max_length=43,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Токен календаря"
+    )
 
     class Meta:
         verbose_name = "Настройка планера"
         verbose_name_plural = "Настройки планера"
 
     def __str__(self):
-        return f"Настройки планера ({self.user.username})"
\ No newline at end of file
+        return f"Настройки планера ({self.user.username})"
+
+    def get_work_days(self):
+        """Список рабочих дней недели (1 - понедельник, 7 - воскресенье).
+
+        Значения вне 1-7 отбрасываются: без них цикл поиска рабочего дня не закончится.
+        """
+        days = sorted({int(value) for value in self.work_days.split(',')
+                       if value.strip().isdecimal() and 1 <= int(value) <= 7})
+        return days or [1, 2, 3, 4, 5]
+
+    def get_day_bounds(self):
+        """Рабочий интервал дня в минутах от полуночи"""
+        start = time_to_minutes(self.day_start_time)
+        return start, min(start + self.hours_per_day * 60, 24 * 60)
+
+    def get_calendar_token(self):
+        if not self.calendar_token:
+            self.calendar_token = secrets.token_urlsafe(32)
+            self.save(update_fields=['calendar_token'])
+        return self.calendar_token
+
+    def reset_calendar_token(self):
+        """Выдает новую ссылку на календарь, старая перестает работать"""
+        self.calendar_token = None
+        return self.get_calendar_token()
+
+    @classmethod
+    def get_default_status_id(cls, user_id):
+        """Возвращает id статуса по умолчанию.
+
+        Без кеша: локальный кеш у каждого воркера свой, и после удаления статуса
+        другие воркеры подставляли бы в заказы несуществующий id. Запрос один,
+        по уникальному индексу user_id.
+        """
+        return cls.objects.filter(user_id=user_id).values_list('default_status_id', flat=True).first()
+
+    @classmethod
+    def set_default_status(cls, user, status):
+        """Делает статус статусом по умолчанию одной записью в настройках"""
+        updated = cls.objects.filter(user=user).update(default_status=status)
+        if not updated:
+            cls.objects.create(user=user, default_status=status)
+
+def count_work_days(start, end, work_days):
+    """Количество рабочих дней в полуинтервале [start, end)"""
+    days = (end - start).days
+    if days <= 0:
+        return 0
+    full_weeks, rest = divmod(days, 7)
+    count = full_weeks * len(set(work_days))
+    for i in range(rest):
+        if ((start + timedelta(days=full_weeks * 7 + i)).weekday() + 1) in work_days:
+            count += 1
+    return count
+
+class RecurringOrder(models.Model):
+    """Правило повторяющегося заказа.
+
+    Повторения не хранятся в таблице заказов: они вычисляются для
+    отображаемого окна планера и превращаются в настоящий Order только
+    при редактировании.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
+    title = models.CharField(max_length=200, verbose_name="Название заказа")
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name='recurring_orders',
+        verbose_name="Заказчик"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Категория"
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
+    comment = models.TextField(blank=True, null=True, verbose_name="Комментарий")
+    planned_minutes = models.PositiveIntegerField(default=60, verbose_name="Планируемые минуты")
+    color = models.CharField(max_length=7, default='#007bff', verbose_name="Цвет в планере")
+    interval_work_days = models.PositiveIntegerField(
+        default=5,
+        verbose_name="Интервал (рабочих дней)",
+        help_text="Заказ повторяется каждые N рабочих дней из настроек планера"
+    )
+    start_date = models.DateField(verbose_name="Дата начала")
+    end_date = models.DateField(null=True, blank=True, verbose_name="Дата окончания")
+    is_active = models.BooleanField(default=True, verbose_name="Активно")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Повторяющийся заказ"
+        verbose_name_plural = "Повторяющиеся заказы"
+        ordering = ['start_date']
+
+    def __str__(self):
+        return f"{self.title} ({self.user.username})"
+
+    def save(self, *args, **kwargs):
+        if not self.color or self.color == '#007bff':
+            self.color = random.choice(PLANNER_COLORS)
+        super().save(*args, **kwargs)
+
+    def occurrence_dates(self, window_start, window_end, work_days):
+        """Даты повторений внутри окна [window_start, window_end]"""
+        work_days = [day for day in work_days if 1 <= day <= 7]
+        if not work_days or not self.interval_work_days:
+            return []
+
+        # Первое повторение - первый рабочий день, начиная с start_date
+        first = self.start_date
+        while (first.weekday() + 1) not in work_days:
+            first += timedelta(days=1)
+
+        day = max(window_start, first)
+        last = min(window_end, self.end_date) if self.end_date else window_end
+
+        # Номер рабочего дня от начала правила считаем арифметически,
+        # не перебирая все дни до начала окна
+        index = count_work_days(first, day, work_days)
+        dates = []
+        while day <= last:
+            if (day.weekday() + 1) in work_days:
+                if index % self.interval_work_days == 0:
+                    dates.append(day)
+                index += 1
+            day += timedelta(days=1)
+        return dates
+
+    def build_occurrence(self, occurrence_date):
+        """Несохраненный заказ-повторение для отображения в планере"""
+        return Order(
+            user=self.user,
+            title=self.title,
+            customer=self.customer,
+            category=self.category,
+            price=self.price,
+            comment=self.comment,
+            planned_date=occurrence_date,
+            planned_minutes=self.planned_minutes,
+            color=self.color,
+            recurring_order=self,
+            occurrence_date=occurrence_date,
+        )
+
+    def materialize(self, occurrence_date):
+        """Создает настоящий заказ для повторения (или возвращает уже созданный)"""
+        order = Order.objects.filter(recurring_order=self, occurrence_date=occurrence_date).first()
+        if order is None:
+            order = self.build_occurrence(occurrence_date)
+            order.save()
+        return order
+
+    @classmethod
+    def expand_for_user(cls, user, window_start, window_end, work_days):
+        """Виртуальные повторения пользователя по дням окна: {дата: [Order, ...]}"""
+        rules = list(
+            cls.objects.filter(user=user, is_active=True, start_date__lte=window_end)
+            .filter(models.Q(end_date__isnull=True) | models.Q(end_date__gte=window_start))
+            .select_related('customer', 'category')
+        )
+        if not rules:
+            return {}
+
+        # Уже материализованные и пропущенные повторения не показываем
+        taken = set(
+            Order.objects.filter(recurring_order__in=rules, occurrence_date__range=(window_start, window_end))
+            .values_list('recurring_order_id', 'occurrence_date')
+        )
+        taken.update(
+            ArchivedOrder.objects.filter(recurring_order__in=rules, occurrence_date__range=(window_start, window_end))
+            .values_list('recurring_order_id', 'occurrence_date')
+        )
+        taken.update(
+            RecurringOrderSkip.objects.filter(recurring_order__in=rules, date__range=(window_start, window_end))
+            .values_list('recurring_order_id', 'date')
+        )
+
+        occurrences = {}
+        for rule in rules:
+            for occurrence_date in rule.occurrence_dates(window_start, window_end, work_days):
+                if (rule.pk, occurrence_date) not in taken:
+                    occurrences.setdefault(occurrence_date, []).append(rule.build_occurrence(occurrence_date))
+        return occurrences
+
+class RecurringOrderSkip(models.Model):
+    """Удаленное повторение, которое больше не нужно показывать"""
+    recurring_order = models.ForeignKey(
+        RecurringOrder,
+        on_delete=models.CASCADE,
+        related_name='skips',
+        verbose_name="Повторяющийся заказ"
+    )
+    date = models.DateField(verbose_name="Дата повторения")
+
+    class Meta:
+        verbose_name = "Пропуск повторения"
+        verbose_name_plural = "Пропуски повторений"
+        unique_together = ['recurring_order', 'date']
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса поиска: слово -> заказ или клиент"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
+    term = models.CharField(max_length=50, verbose_name="Слово")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    weight = models.PositiveSmallIntegerField(default=1, verbose_name="Вес")
+
+    class Meta:
+        verbose_name = "Поисковый терм"
+        verbose_name_plural = "Поисковые термы"
+        indexes = [
+            models.Index(fields=['user', 'term'], name='search_user_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class ArchivedOrder(models.Model):
+    """Заказ, перенесенный из основной таблицы в архив.
+
+    Поля повторяют Order; id сохраняется, поэтому ссылки на заказ
+    продолжают работать и после архивации.
+    """
+    ARCHIVED_FIELDS = [
+        'id', 'user_id', 'title', 'customer_id', 'category_id', 'price', 'comment', 'status_id',
+        'planned_date', 'planned_minutes', 'planned_start_time', 'planned_end_time', 'color',
+        'order_in_day', 'recurring_order_id', 'occurrence_date', 'version', 'created_at', 'updated_at',
+    ]
+
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID заказа")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь")
+    title = models.CharField(max_length=200, verbose_name="Название заказа")
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name='archived_orders',
+        verbose_name="Заказчик"
+    )
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Категория")
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
+    comment = models.TextField(blank=True, null=True, verbose_name="Комментарий")
+    status = models.ForeignKey(OrderStatus, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Статус")
+    planned_date = models.DateField(null=True, blank=True, verbose_name="Планируемая дата")
+    planned_minutes = models.PositiveIntegerField(default=60, verbose_name="Планируемые минуты")
+    planned_start_time = models.TimeField(null=True, blank=True, verbose_name="Время начала")
+    planned_end_time = models.TimeField(null=True, blank=True, verbose_name="Время окончания")
+    color = models.CharField(max_length=7, default='#007bff', verbose_name="Цвет в планере")
+    order_in_day = models.PositiveIntegerField(null=True, blank=True, verbose_name="Порядковый номер в дне")
+    recurring_order = models.ForeignKey(
+        RecurringOrder,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Повторяющийся заказ"
+    )
+    occurrence_date = models.DateField(null=True, blank=True, verbose_name="Дата повторения")
+    # Версия переносится в архив и обратно: клиент со старой версией не получит ложный конфликт
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Версия")
+    created_at = models.DateTimeField(verbose_name="Дата создания")
+    updated_at = models.DateTimeField(verbose_name="Дата обновления")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата архивации")
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архивные заказы"
+        ordering = ['-created_at']
+        indexes = [
+            # Обзор планера группирует архив по дням окна
+            models.Index(fields=['user', 'planned_date'], name='archived_order_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.user.username}, архив)"
+
+
+class ChangeLogEntry(models.Model):
+    """Запись журнала изменений для дельта-синхронизации клиентов.
+
+    id служит курсором: клиент запрашивает изменения после последнего
+    полученного id. По каждому объекту хранится только последняя запись.
+    """
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = [
+        (ACTION_UPSERT, 'Создан или изменен'),
+        (ACTION_DELETE, 'Удален'),
+    ]
+
+    # При удалении пользователя журнал удаляется каскадом, а новые записи
+    # об удалении его объектов не пишутся (см. sync.object_deleted)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Пользователь"
+    )
+    model = models.CharField(max_length=20, verbose_name="Тип объекта")
+    object_id = models.BigIntegerField(verbose_name="ID объекта")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="Действие")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата изменения")
+
+    class Meta:
+        verbose_name = "Запись журнала изменений"
+        verbose_name_plural = "Журнал изменений"
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_cursor_idx'),
+            models.Index(fields=['user', 'model', 'object_id'], name='changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}: {self.action}"
+
+
+class Job(models.Model):
+    """Отложенная задача для фонового воркера (manage.py run_jobs)"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Выполнена'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Задача")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name="Максимум попыток")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Запустить после")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Воркер")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начата")
+    # Воркер обновляет поле, пока выполняет задачу; по нему находятся брошенные задачи
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Последний сигнал воркера")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+    duration_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name="Время выполнения, мс")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            # Выборка воркером: WHERE status = 'pending' AND run_at <= now ORDER BY run_at
+            models.Index(fields=['status', 'run_at'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}: {self.get_status_display()}"
@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import ChangeLogEntry, Order, OrderVersionConflict, PlannerSettings
+from .sync import log_changes
+
+
+def renumber_day(user, day_date, moved_id=None, position=None):
+    """Плотно нумерует заказы дня (0, 1, 2...), вставляя moved_id на позицию position.
+
+    У перенумерованных заказов растет version, иначе открытая форма или планировщик
+    на другом устройстве перезаписали бы позицию устаревшим order_in_day.
+    Возвращает {id: новая version} для заказов, у которых изменился order_in_day.
+    """
+    rows = list(Order.objects
+                .filter(user=user, planned_date=day_date)
+                .order_by(F('order_in_day').asc(nulls_last=True), 'id')
+                .values_list('id', 'order_in_day'))
+    current = dict(rows)
+    sequence = [pk for pk, order_in_day in rows if pk != moved_id]
+    if moved_id is not None:
+        if position is None or position > len(sequence):
+            position = len(sequence)
+        sequence.insert(max(position, 0), moved_id)
+
+    changed = {pk: index for index, pk in enumerate(sequence) if current.get(pk) != index}
+    if changed:
+        # Один UPDATE на весь день вместо запроса на каждый заказ
+        Order.objects.filter(pk__in=changed).update(
+            order_in_day=Case(
+                *[When(pk=pk, then=Value(index)) for pk, index in changed.items()],
+                output_field=IntegerField(),
+            ),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        return dict(Order.objects.filter(pk__in=changed).values_list('id', 'version'))
+    return {}
+
+def move_order(user, order_id, planned_date, position=None, expected_version=None):
+    """Переносит заказ на день и позицию условным UPDATE ... WHERE version = expected_version.
+
+    Если версия не совпала, поднимает OrderVersionConflict и ничего не меняет.
+    Без expected_version сверяется версия, прочитанная в начале операции.
+    При смене дня время начала сбрасывается, как в bulk_actions.reschedule:
+    в новом дне слот может быть занят, а без даты время не задается.
+    Возвращает ({id: новая version} для перенесенного заказа и его соседей, даты затронутых дней).
+    """
+    with transaction.atomic():
+        # Переносы одного пользователя выполняются по очереди: так перенумерация
+        # дней не пересекается и не ловит взаимных блокировок
+        list(PlannerSettings.objects.select_for_update().filter(user=user).values_list('id', flat=True))
+
+        current = Order.objects.filter(pk=order_id, user=user).values('planned_date', 'version').first()
+        if current is None:
+            raise Order.DoesNotExist
+        if expected_version is None:
+            expected_version = current['version']
+
+        fields = {}
+        if current['planned_date'] != planned_date:
+            fields.update(planned_start_time=None, planned_end_time=None)
+        updated = (Order.objects
+                   .filter(pk=order_id, user=user, version=expected_version)
+                   .update(planned_date=planned_date,
+                           order_in_day=position if planned_date else None,
+                           version=F('version') + 1,
+                           updated_at=timezone.now(),
+                           **fields))
+        if not updated:
+            raise OrderVersionConflict(order_id)
+
+        versions = {order_id: expected_version + 1}
+        days = []
+        if planned_date:
+            versions.update(renumber_day(user, planned_date, order_id, position))
+            days.append(planned_date)
+        source_date = current['planned_date']
+        if source_date and source_date != planned_date:
+            versions.update(renumber_day(user, source_date))
+            days.append(source_date)
+
+        # update() обходит сигналы, поэтому журнал изменений пополняется явно
+        log_changes(user.pk, 'orders', list(versions), ChangeLogEntry.ACTION_UPSERT)
+    return versions, days
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .db_router import pinned_to_primary
+from .models import Category, OrderStatus, PlannerSettings
+
+# Шаблоны нового аккаунта; ATELIER_TENANT_TEMPLATES в настройках дополняет или заменяет их
+DEFAULT_TENANT_TEMPLATES = {
+    'default': {
+        'statuses': [
+            {'name': 'Новый', 'color': '#007bff'},
+            {'name': 'В работе', 'color': '#28a745'},
+            {'name': 'Завершен', 'color': '#ffffff', 'is_final': True},
+            {'name': 'Отменен', 'color': '#6c757d', 'is_final': True},
+        ],
+        'default_status': 'Новый',
+        'categories': [],
+        'settings': {},
+    },
+    # Со стартовым набором услуг: мастер сразу видит цены по умолчанию
+    'atelier': {
+        'statuses': [
+            {'name': 'Новый', 'color': '#007bff'},
+            {'name': 'В работе', 'color': '#28a745'},
+            {'name': 'Примерка', 'color': '#F9A826'},
+            {'name': 'Завершен', 'color': '#ffffff', 'is_final': True},
+            {'name': 'Отменен', 'color': '#6c757d', 'is_final': True},
+        ],
+        'default_status': 'Новый',
+        'categories': [
+            {'name': 'Подшив брюк', 'default_price': 500, 'color': '#4ECDC4'},
+            {'name': 'Замена молнии', 'default_price': 700, 'color': '#45B7D1'},
+            {'name': 'Ушив по боковым швам', 'default_price': 1200, 'color': '#FF6B6B'},
+            {'name': 'Индивидуальный пошив', 'default_price': 5000, 'color': '#6A0572'},
+        ],
+        'settings': {},
+    },
+}
+DEFAULT_TENANT_TEMPLATE = 'default'
+DEFAULT_PROVISION_BATCH_SIZE = 500
+
+
+def get_tenant_templates():
+    return {**DEFAULT_TENANT_TEMPLATES, **getattr(settings, 'ATELIER_TENANT_TEMPLATES', {})}
+
+def get_tenant_template(name=None):
+    if name is None:
+        name = getattr(settings, 'ATELIER_TENANT_TEMPLATE', DEFAULT_TENANT_TEMPLATE)
+    templates = get_tenant_templates()
+    if name not in templates:
+        raise LookupError(f'Unknown tenant template: {name}')
+    return templates[name]
+
+def provision_users(users, template=None):
+    """Создает настройки, статусы и стартовые категории аккаунтов одной транзакцией.
+
+    Все вставки - bulk_create, число запросов не зависит от количества аккаунтов.
+    Аккаунты, у которых уже есть настройки планера, пропускаются; статусы и категории
+    с уже занятыми названиями не дублируются. Возвращает количество подготовленных аккаунтов.
+    """
+    template = get_tenant_template(template)
+    user_ids = [user.pk for user in users]
+    with transaction.atomic():
+        provisioned = set(PlannerSettings.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        pending = [pk for pk in user_ids if pk not in provisioned]
+        if not pending:
+            return 0
+
+        # ignore_conflicts: у старых аккаунтов часть статусов могла появиться раньше настроек
+        OrderStatus.objects.bulk_create([
+            OrderStatus(user_id=pk, **status) for pk in pending for status in template['statuses']
+        ], ignore_conflicts=True)
+        Category.objects.bulk_create([
+            Category(user_id=pk, **category) for pk in pending for category in template.get('categories', [])
+        ], ignore_conflicts=True)
+
+        # Id после bulk_create с ignore_conflicts известны не на всех СУБД, поэтому перечитываем
+        default_status_ids = dict(OrderStatus.objects
+                                  .filter(user_id__in=pending, name=template['default_status'])
+                                  .values_list('user_id', 'id'))
+        PlannerSettings.objects.bulk_create([
+            PlannerSettings(user_id=pk, default_status_id=default_status_ids.get(pk), **template.get('settings', {}))
+            for pk in pending
+        ])
+    return len(pending)
+
+def provision_user(user, template=None):
+    return provision_users([user], template)
+
+def get_planner_settings(user):
+    """Настройки планера; аккаунт без них (созданный до сервиса подготовки) готовится по шаблону"""
+    try:
+        return PlannerSettings.objects.get(user=user)
+    except PlannerSettings.DoesNotExist:
+        pass
+    try:
+        provision_user(user)
+    except IntegrityError:
+        # Параллельный запрос подготовил аккаунт первым
+        pass
+    # Только что записанное еще может не дойти до реплики
+    with pinned_to_primary():
+        return PlannerSettings.objects.get(user=user)
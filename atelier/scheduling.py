@@ -0,0 +1,70 @@
+from datetime import time
+
+MINUTES_IN_DAY = 24 * 60
+
+
+def time_to_minutes(value):
+    return value.hour * 60 + value.minute
+
+def minutes_to_time(minutes):
+    minutes = max(0, min(minutes, MINUTES_IN_DAY - 1))
+    return time(minutes // 60, minutes % 60)
+
+
+class DayIntervals:
+    """Занятые интервалы дня (в минутах от полуночи) и свободные промежутки между ними.
+
+    Строится по заказам одного дня, которые уже загружены одним запросом, за один
+    проход; проверки линейны по числу заказов дня (их единицы или десятки).
+    Интервалы могут пересекаться между собой.
+    """
+
+    def __init__(self, intervals, day_start=0, day_end=MINUTES_IN_DAY):
+        self.day_start = day_start
+        self.day_end = day_end
+        self.intervals = sorted(intervals)
+        # Свободные промежутки рабочего дня по возрастанию начала, в том числе пустые
+        self.gaps = []
+        cursor = day_start
+        for start, end, key in self.intervals:
+            self.gaps.append((cursor, max(cursor, min(start, day_end))))
+            cursor = max(cursor, end)
+        self.gaps.append((cursor, max(cursor, day_end)))
+
+    @classmethod
+    def from_orders(cls, orders, day_start=0, day_end=MINUTES_IN_DAY):
+        """orders - кортежи (ключ, planned_start_time, planned_minutes) или объекты Order"""
+        intervals = []
+        for order in orders:
+            if isinstance(order, tuple):
+                key, start_time, minutes = order
+            else:
+                key, start_time, minutes = order.pk, order.planned_start_time, order.planned_minutes
+            if start_time is None:
+                continue
+            start = time_to_minutes(start_time)
+            intervals.append((start, min(start + (minutes or 0), MINUTES_IN_DAY), key))
+        return cls(intervals, day_start, day_end)
+
+    def conflicts(self, start, end):
+        """Ключи интервалов, пересекающихся с [start, end)"""
+        return [key for interval_start, interval_end, key in self.intervals
+                if interval_start < end and interval_end > start]
+
+    def in_work_hours(self, start, duration):
+        return self.day_start <= start and start + duration <= self.day_end
+
+    def fits(self, start, duration):
+        return self.in_work_hours(start, duration) and not self.conflicts(start, start + duration)
+
+    def next_free_slot(self, duration, not_before=None):
+        """Начало ближайшего свободного промежутка длиной duration или None"""
+        not_before = self.day_start if not_before is None else max(not_before, self.day_start)
+        for gap_start, gap_end in self.gaps:
+            start = max(gap_start, not_before)
+            if gap_end - start >= duration:
+                return start
+        return None
+
+    def free_gaps(self):
+        return [(start, end) for start, end in self.gaps if end > start]
@@ -0,0 +1,139 @@
+import re
+from collections import defaultdict
+
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Customer, Order, SearchTerm
+
+TERM_MAX_LENGTH = 50
+WORD_RE = re.compile(r'\w+')
+
+# Веса полей при ранжировании
+ORDER_FIELDS = (('title', 3), ('comment', 1))
+CUSTOMER_FIELDS = (('last_name', 3), ('first_name', 3), ('comment', 1))
+PHONE_WEIGHT = 2
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = text.lower().replace('ё', 'е')
+    return [word[:TERM_MAX_LENGTH] for word in WORD_RE.findall(text) if len(word) > 1]
+
+def phone_terms(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    # Номер ищут и с кодом страны, и без него: +7 999... и 999...
+    terms = {digits}
+    if len(digits) > 10:
+        terms.add(digits[-10:])
+    return list(terms)
+
+def build_terms(instance, fields):
+    weights = defaultdict(int)
+    for field, weight in fields:
+        for term in tokenize(getattr(instance, field)):
+            weights[term] += weight
+    return weights
+
+def index_order(order):
+    weights = build_terms(order, ORDER_FIELDS)
+    SearchTerm.objects.filter(order=order).delete()
+    SearchTerm.objects.bulk_create([
+        SearchTerm(user_id=order.user_id, order=order, term=term, weight=weight)
+        for term, weight in weights.items()
+    ])
+
+def index_customer(customer):
+    weights = build_terms(customer, CUSTOMER_FIELDS)
+    for term in phone_terms(customer.phone):
+        weights[term] += PHONE_WEIGHT
+    SearchTerm.objects.filter(customer=customer).delete()
+    SearchTerm.objects.bulk_create([
+        SearchTerm(user_id=customer.user_id, customer=customer, term=term, weight=weight)
+        for term, weight in weights.items()
+    ])
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_order(instance)
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_customer(instance)
+
+# Удаление из индекса происходит каскадом по внешним ключам SearchTerm
+
+
+def search(user, query, limit=50):
+    """Ранжированный поиск по заказам и клиентам пользователя.
+
+    Каждое слово запроса ищется как префикс терма по индексу (user, term).
+    Сначала идут объекты, совпавшие с большим числом слов запроса, затем
+    с большим суммарным весом.
+    """
+    terms = tokenize(query)
+    terms += [term for term in phone_terms(query) if term not in terms]
+    terms = terms[:10]
+    if not terms:
+        return {'orders': [], 'customers': []}
+
+    condition = Q()
+    for term in terms:
+        condition |= Q(term__startswith=term)
+
+    matched = sum(
+        Max(Case(When(term__startswith=term, then=1), default=0, output_field=IntegerField()))
+        for term in terms
+    )
+    rows = (SearchTerm.objects
+            .filter(condition, user=user)
+            .values('order_id', 'customer_id')
+            .annotate(matched=matched, score=Sum('weight'))
+            .order_by('-matched', '-score')[:limit])
+
+    ranked = list(rows)
+    orders = Order.objects.select_related('customer', 'status').in_bulk(
+        [row['order_id'] for row in ranked if row['order_id']]
+    )
+    customers = Customer.objects.in_bulk(
+        [row['customer_id'] for row in ranked if row['customer_id']]
+    )
+    return {
+        'orders': [orders[row['order_id']] for row in ranked if row['order_id'] in orders],
+        'customers': [customers[row['customer_id']] for row in ranked if row['customer_id'] in customers],
+    }
+
+def rebuild_index(user=None):
+    """Полная переиндексация (например, после массовых update() в обход save)"""
+    orders = Order.objects.all()
+    customers = Customer.objects.all()
+    terms = SearchTerm.objects.all()
+    if user is not None:
+        orders = orders.filter(user=user)
+        customers = customers.filter(user=user)
+        terms = terms.filter(user=user)
+    terms.delete()
+
+    batch = []
+    for order in orders.only('id', 'user_id', 'title', 'comment').iterator():
+        for term, weight in build_terms(order, ORDER_FIELDS).items():
+            batch.append(SearchTerm(user_id=order.user_id, order_id=order.pk, term=term, weight=weight))
+        if len(batch) >= 1000:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    for customer in customers.only('id', 'user_id', 'first_name', 'last_name', 'phone', 'comment').iterator():
+        weights = build_terms(customer, CUSTOMER_FIELDS)
+        for term in phone_terms(customer.phone):
+            weights[term] += PHONE_WEIGHT
+        for term, weight in weights.items():
+            batch.append(SearchTerm(user_id=customer.user_id, customer_id=customer.pk, term=term, weight=weight))
+        if len(batch) >= 1000:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
@@ -0,0 +1,143 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const urlParams = new URLSearchParams(window.location.search);
+    const plannedDateFromUrl = urlParams.get('planned_date'); 
+    const categorySelect = document.getElementById('id_category');
+    const priceInput = document.getElementById('id_price');
+    const plannedDateInput = document.getElementById('id_planned_date');
+    const firstNameInput = document.getElementById('id_customer_first_name');
+    const phoneInput = document.getElementById('id_customer_phone');
+    const firstNameSuggestions = document.getElementById('customerFirstNameSuggestions');
+    const phoneSuggestions = document.getElementById('customerPhoneSuggestions');
+    
+    if (plannedDateFromUrl && plannedDateInput && !plannedDateInput.value) {
+        plannedDateInput.value = plannedDateFromUrl;
+        console.log('Auto-filled planned date:', plannedDateFromUrl);
+    }   
+
+    let customersData = [];
+    let debounceTimer;
+
+    // Загружаем список клиентов
+    function loadCustomers() {
+        fetch(document.getElementById('orderForm').dataset.customersUrl)
+            .then(response => {
+                if (!response.ok) throw new Error('Network error');
+                return response.json();
+            })
+            .then(data => {
+                customersData = data;
+                console.log('Loaded customers:', customersData.length);
+            })
+            .catch(error => console.error('Error loading customers:', error));
+    }
+
+    // Поиск клиентов
+    function searchCustomers(field, value) {
+        if (!value || value.trim().length < 2) {
+            return [];
+        }
+        
+        const searchValue = value.toLowerCase().trim();
+        return customersData.filter(customer => {
+            if (field === 'first_name') {
+                return customer.first_name.toLowerCase().includes(searchValue);
+            } else if (field === 'phone') {
+                return customer.phone.includes(searchValue);
+            }
+            return false;
+        });
+    }
+
+    // Показ подсказок
+    function showSuggestions(suggestionsContainer, suggestions, field) {
+        suggestionsContainer.innerHTML = '';
+        
+        if (suggestions.length === 0) {
+            suggestionsContainer.style.display = 'none';
+            return;
+        }
+        
+        suggestionsContainer.style.display = 'block';
+        
+        suggestions.slice(0, 10).forEach(customer => {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.innerHTML = field === 'first_name' 
+                ? `${customer.first_name} <small class="text-muted">${customer.phone}</small>`
+                : `${customer.phone} <small class="text-muted">${customer.first_name}</small>`;
+            
+            item.addEventListener('click', () => {
+                firstNameInput.value = customer.first_name;
+                phoneInput.value = customer.phone;
+                suggestionsContainer.style.display = 'none';
+            });
+            
+            suggestionsContainer.appendChild(item);
+        });
+    }
+
+    // Обработчики событий для поиска клиентов
+    if (firstNameInput && phoneInput) {
+        firstNameInput.addEventListener('input', function() {
+            clearTimeout(debounceTimer);
+            debounceTimer = setTimeout(() => {
+                const suggestions = searchCustomers('first_name', this.value);
+                showSuggestions(firstNameSuggestions, suggestions, 'first_name');
+            }, 300);
+        });
+
+        phoneInput.addEventListener('input', function() {
+            clearTimeout(debounceTimer);
+            debounceTimer = setTimeout(() => {
+                const suggestions = searchCustomers('phone', this.value);
+                showSuggestions(phoneSuggestions, suggestions, 'phone');
+            }, 300);
+        });
+
+        // Скрытие подсказок при клике вне
+        document.addEventListener('click', function(e) {
+            if (firstNameSuggestions && !firstNameInput.contains(e.target) && !firstNameSuggestions.contains(e.target)) {
+                firstNameSuggestions.style.display = 'none';
+            }
+            if (phoneSuggestions && !phoneInput.contains(e.target) && !phoneSuggestions.contains(e.target)) {
+                phoneSuggestions.style.display = 'none';
+            }
+        });
+
+        // Загружаем клиентов при загрузке страницы
+        loadCustomers();
+    }
+
+    // Существующий код для категорий и цены
+    if (categorySelect && priceInput) {
+        const originalPrice = priceInput.value;
+        let priceWasManuallyChanged = false;
+        
+        priceInput.addEventListener('input', function() {
+            priceWasManuallyChanged = true;
+        });
+        
+        categorySelect.addEventListener('change', function() {
+            if (!priceWasManuallyChanged || priceInput.value === originalPrice || priceInput.value === '') {
+                const selectedOption = categorySelect.options[categorySelect.selectedIndex];
+                const price = selectedOption.getAttribute('data-price');
+                if (price) {
+                    priceInput.value = price;
+                }
+            }
+        });
+        
+        // Инициализируем цену при загрузке, если категория выбрана
+        if (categorySelect.value) {
+            const selectedOption = categorySelect.options[categorySelect.selectedIndex];
+            const price = selectedOption.getAttribute('data-price');
+            if (price && (!priceWasManuallyChanged || priceInput.value === originalPrice || priceInput.value === '')) {
+                priceInput.value = price;
+            }
+        }
+    }
+
+    // Отладочная информация
+    console.log('Planned date input value:', plannedDateInput?.value);
+});
@@ -0,0 +1,506 @@
+// Адреса и CSRF-токен приходят из data-атрибутов #planner-container (index.html)
+const plannerConfig = document.getElementById('planner-container').dataset;
+
+document.addEventListener('DOMContentLoaded', function() {
+    const utilizationBars = document.querySelectorAll('.day-utilization');
+    utilizationBars.forEach(bar => {
+        const percentage = bar.getAttribute('data-percentage');
+        if (percentage) {
+            setTimeout(() => {
+                bar.style.width = percentage + '%';
+                
+                // Меняем цвет индикатора при превышении
+                if (percentage > 100) {
+                    bar.style.backgroundColor = '#dc3545';
+                }
+            }, 100);
+        }
+    });  
+    console.log('Инициализация планера...');
+    if (typeof initializePlanner === 'function') {
+        initializePlanner();
+    }
+});
+
+// Также добавьте обработчик для кнопок вне Sortable
+document.addEventListener('click', function(e) {
+    if (e.target.closest('.order-link')) {
+        e.stopPropagation();
+    } else if (e.target.closest('[data-action]')) {
+        e.preventDefault();
+        const action = e.target.closest('[data-action]').getAttribute('data-action');
+        manageWeeks(action);
+    }
+});
+
+// Основная функция инициализации планера
+function initializePlanner() {
+    console.log('Переинициализация планера...');
+    
+    // 1. Инициализация незапланированных заказов
+    const unplannedContainer = document.getElementById('unplanned-orders');
+    if (unplannedContainer) {
+        try {
+            new Sortable(unplannedContainer, {
+                group: {
+                    name: 'orders',
+                    pull: 'clone',
+                    put: true
+                },
+                sort: true,
+                animation: 150,
+                ghostClass: 'sortable-ghost',
+                onEnd: function(evt) {
+                    if (evt.to !== evt.from && evt.to.classList.contains('orders-container')) {
+                        return;
+                    }
+                    
+                    if (evt.from && evt.item) {
+                        if (evt.to === evt.from) {
+                            updateUnplannedOrderOrder(evt.to);
+                        }
+                    }
+                }
+            });
+            console.log('Незапланированные заказы инициализированы');
+        } catch (e) {
+            console.error('Ошибка инициализации незапланированных заказов:', e);
+        }
+    }
+
+    // 2. Инициализация всех колонок дней
+    const dayColumns = document.querySelectorAll('.orders-container');
+    
+    dayColumns.forEach(container => {
+        try {
+            const columnElement = container.closest('.planner-column');
+            const totalDayMinutes = parseInt(columnElement?.dataset?.totalMinutes || '480');
+            
+            new Sortable(container, {
+                group: {
+                    name: 'orders',
+                    put: function(to, from, dragEl) {
+                        try {
+                            let totalMinutes = 0;
+                            const children = to.children;
+                            
+                            if (!children) return true;
+                            
+                            for (let i = 0; i < children.length; i++) {
+                                const child = children[i];
+                                if (child.classList.contains('order-brick') && child !== dragEl) {
+                                    const minutes = parseInt(child.dataset.minutes || '0');
+                                    totalMinutes += minutes;
+                                }
+                            }
+                            
+                            const dragMinutes = parseInt(dragEl.dataset.minutes || '0');
+                            totalMinutes += dragMinutes;
+                            
+                            if (totalMinutes > totalDayMinutes) {
+                                alert('Превышен лимит времени в этом дне! Максимум: ' + totalDayMinutes + ' минут.');
+                                return false;
+                            }
+                            
+                            return true;
+                        } catch (e) {
+                            console.error('Ошибка проверки лимита:', e);
+                            return true;
+                        }
+                    }
+                },
+                animation: 150,
+                // Виртуальные повторения не перетаскиваются, пока не станут заказами
+                filter: '.virtual-occurrence',
+                preventOnFilter: false,
+                ghostClass: 'sortable-ghost',
+                chosenClass: 'sortable-chosen',
+                dragClass: 'sortable-drag',
+                onAdd: function(evt) {
+                    console.log('Заказ перемещен:', evt.item.dataset.orderId);
+                    const orderId = evt.item.dataset.orderId;
+                    const columnElement = evt.to.closest('.planner-column');
+                    if (!orderId || !columnElement) return;
+                    
+                    const date = columnElement.dataset.date;
+                    
+                    const orders = evt.to.querySelectorAll('.order-brick:not(.virtual-occurrence)');
+                    let orderInDay = Array.from(orders).indexOf(evt.item);
+                    
+                    if (orderInDay >= 0) {
+                        updateOrderPlanning(orderId, date, orderInDay);
+                    }
+                },
+                onUpdate: function(evt) {
+                    const columnElement = evt.to.closest('.planner-column');
+                    const orderId = evt.item.dataset.orderId;
+                    if (!columnElement || !orderId) return;
+                    
+                    // Сервер сам перенумерует день, отправляем только перемещенный заказ
+                    const orders = evt.to.querySelectorAll('.order-brick:not(.virtual-occurrence)');
+                    const orderInDay = Array.from(orders).indexOf(evt.item);
+                    if (orderInDay >= 0) {
+                        updateOrderPlanning(orderId, columnElement.dataset.date, orderInDay);
+                    }
+                },
+                onRemove: function(evt) {
+                    if (evt.to && evt.to.id === 'unplanned-orders') {
+                        const orderId = evt.item.dataset.orderId;
+                        if (orderId) {
+                            updateOrderPlanning(orderId, null, null);
+                        }
+                    }
+                }
+            });
+        } catch (e) {
+            console.error('Ошибка инициализации колонки:', e);
+        }
+    });
+    
+    console.log('Планировщик полностью переинициализирован');
+}
+
+// Функция загрузки дополнительных недель
+function loadMoreWeeks(direction) {
+    const urlParams = new URLSearchParams(window.location.search);
+    let currentWeeks = parseInt(urlParams.get('weeks') || 1);
+    let startDate = urlParams.get('start_date');
+    let newStartDate = startDate;
+    
+    // Если start_date не указан, используем текущую дату
+    if (!startDate) {
+        const today = new Date();
+        const startOfWeek = new Date(today);
+        startOfWeek.setDate(today.getDate() - today.getDay() + (today.getDay() === 0 ? -6 : 1));
+        startDate = startOfWeek.toISOString().split('T')[0];
+        newStartDate = startDate;
+    }
+    
+    if (direction === 'left') {
+        // Добавляем неделю слева - смещаем start_date на 7 дней назад
+        const currentStartDate = new Date(startDate);
+        currentStartDate.setDate(currentStartDate.getDate() - 7);
+        newStartDate = currentStartDate.toISOString().split('T')[0];
+        currentWeeks += 1;
+    } else if (direction === 'right') {
+        // Добавляем неделю справа
+        currentWeeks += 1;
+    } else if (direction === 'remove' && currentWeeks > 1) {
+        currentWeeks -= 1;
+    } else {
+        return;
+    }
+    
+    // Обновляем страницу с новыми параметрами
+    window.location.href = `?start_date=${newStartDate}&weeks=${currentWeeks}`;
+}
+
+function manageWeeks(action) {
+    const urlParams = new URLSearchParams(window.location.search);
+    let currentWeeks = parseInt(urlParams.get('weeks') || '1');
+    let startDate = urlParams.get('start_date');
+    
+    // Безопасная обработка даты
+    if (!startDate) {
+        const today = new Date();
+        const startOfWeek = new Date(today);
+        startOfWeek.setDate(today.getDate() - today.getDay() + (today.getDay() === 0 ? -6 : 1));
+        startDate = startOfWeek.toISOString().split('T')[0];
+    }
+    
+    let newStartDate = startDate;
+    
+    // Если start_date не указан, используем текущую дату
+    if (!startDate) {
+        const today = new Date();
+        const startOfWeek = new Date(today);
+        startOfWeek.setDate(today.getDate() - today.getDay() + (today.getDay() === 0 ? -6 : 1));
+        startDate = startOfWeek.toISOString().split('T')[0];
+        newStartDate = startDate;
+    }
+    
+    switch (action) {
+        case 'add_left':
+            // Добавляем неделю слева - смещаем start_date на 7 дней назад
+            const currentStartDate = new Date(startDate);
+            currentStartDate.setDate(currentStartDate.getDate() - 7);
+            newStartDate = currentStartDate.toISOString().split('T')[0];
+            currentWeeks += 1;
+            break;
+            
+        case 'add_right':
+            // Добавляем неделю справа
+            currentWeeks += 1;
+            break;
+            
+        case 'remove_left':
+            // Убираем неделю слева - смещаем start_date на 7 дней вперед
+            if (currentWeeks > 1) {
+                const currentStartDate = new Date(startDate);
+                currentStartDate.setDate(currentStartDate.getDate() + 7);
+                newStartDate = currentStartDate.toISOString().split('T')[0];
+                currentWeeks -= 1;
+            }
+            break;
+            
+        case 'remove_right':
+            // Убираем неделю справа
+            if (currentWeeks > 1) {
+                currentWeeks -= 1;
+            }
+            break;
+            
+        case 'reset':
+            // Сброс к текущей неделе
+            const today = new Date();
+            const startOfWeek = new Date(today);
+            startOfWeek.setDate(today.getDate() - today.getDay() + (today.getDay() === 0 ? -6 : 1));
+            newStartDate = startOfWeek.toISOString().split('T')[0];
+            currentWeeks = 1;
+            break;
+            
+        default:
+            return;
+    }
+    
+    // Обновляем страницу с новыми параметрами
+    window.location.href = `?start_date=${newStartDate}&weeks=${currentWeeks}`;
+}
+
+// Функция загрузки текущей недели
+function loadCurrentWeek() {
+    const today = new Date();
+    const startOfWeek = new Date(today);
+    startOfWeek.setDate(today.getDate() - today.getDay() + (today.getDay() === 0 ? -6 : 1));
+    const startDate = startOfWeek.toISOString().split('T')[0];
+    
+    window.location.href = `?start_date=${startDate}&weeks=1`;
+}
+
+// Функция обновления планирования заказа
+function updateOrderPlanning(orderId, date, orderInDay) {
+    // Преобразуем orderInDay в число или null
+    let orderInDayValue = orderInDay;
+    if (orderInDay === null || orderInDay === undefined || orderInDay === '') {
+        orderInDayValue = null;
+    } else {
+        orderInDayValue = parseInt(orderInDay);
+    }
+    
+    // Версия, которую видел клиент: сервер откажет, если заказ уже изменили
+    const brick = document.querySelector(`.order-brick[data-order-id="${orderId}"]`);
+    const version = brick ? brick.dataset.version : null;
+    
+    fetch(plannerConfig.moveUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': plannerConfig.csrfToken,
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify({
+            order_id: orderId,
+            planned_date: date,
+            order_in_day: orderInDayValue,
+            version: version
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            applyPlanningState(data.order, data.days);
+            applyVersions(data.versions);
+        } else if (data.conflict) {
+            // Заказ изменили на другом устройстве: показываем актуальное состояние
+            applyPlanningState(data.order, data.days);
+            alert(data.error);
+        } else {
+            alert('Ошибка при обновлении заказа: ' + data.error);
+            setTimeout(() => {
+                window.location.reload();
+            }, 300);
+        }
+    })
+    .catch(error => {
+        console.error('Ошибка сети:', error);
+        alert('Ошибка сети: ' + error);
+        setTimeout(() => {
+            window.location.reload();
+        }, 300);
+    });
+}
+
+// Раскладывает заказы дня в порядке, который вернул сервер
+function applyDayState(date, orders) {
+    const container = document.getElementById('orders-' + date);
+    if (!container) return;
+    const touched = new Set();
+    orders.forEach(order => {
+        const bricks = Array.from(document.querySelectorAll(`.order-brick[data-order-id="${order.id}"]`));
+        const brick = bricks.find(item => item.parentElement === container) || bricks[0] || buildOrderBrick(order);
+        // При перетаскивании из "без даты" остается копия - убираем лишние
+        bricks.forEach(item => {
+            if (item !== brick) {
+                touched.add(item.parentElement);
+                item.remove();
+            }
+        });
+        if (brick.parentElement && brick.parentElement !== container) {
+            touched.add(brick.parentElement);
+        }
+        brick.dataset.version = order.version;
+        container.insertBefore(brick, container.querySelector('.virtual-occurrence'));
+    });
+    // Заказы, которых в этом дне на сервере уже нет
+    const ids = new Set(orders.map(order => String(order.id)));
+    container.querySelectorAll('.order-brick:not(.virtual-occurrence)').forEach(item => {
+        if (!ids.has(item.dataset.orderId)) {
+            item.remove();
+        }
+    });
+    if (orders.length) {
+        container.querySelector('.empty-column-message')?.remove();
+    }
+    refreshDayTotals(container);
+    touched.forEach(item => refreshDayTotals(item));
+}
+
+function applyPlanningState(order, days) {
+    Object.entries(days || {}).forEach(([date, orders]) => applyDayState(date, orders));
+    if (!order.planned_date) {
+        const unplanned = document.getElementById('unplanned-orders');
+        const bricks = Array.from(document.querySelectorAll(`.order-brick[data-order-id="${order.id}"]`));
+        let brick = bricks.find(item => item.parentElement === unplanned);
+        bricks.forEach(item => {
+            if (item !== brick) {
+                const container = item.parentElement;
+                item.remove();
+                refreshDayTotals(container);
+            }
+        });
+        if (!brick && unplanned && order.title) {
+            brick = buildOrderBrick(order);
+            unplanned.appendChild(brick);
+        }
+        if (brick) {
+            brick.dataset.version = order.version;
+        }
+    }
+}
+
+// Новые версии заказов, которые перенумеровал сервер: следующий перенос соседа не получит 409
+function applyVersions(versions) {
+    Object.entries(versions || {}).forEach(([id, version]) => {
+        document.querySelectorAll(`.order-brick[data-order-id="${id}"]`).forEach(brick => {
+            brick.dataset.version = version;
+        });
+    });
+}
+
+// Функция обновления порядка в "без даты"
+function updateUnplannedOrderOrder(container) {
+    const orders = container.querySelectorAll('.order-brick');
+    console.log('Обновление порядка в "без даты"');
+    // Здесь можно добавить логику для сохранения порядка
+}
+
+// Живая синхронизация планера между вкладками и устройствами (SSE)
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
+function buildOrderBrick(order) {
+    const totalDayMinutes = parseInt(document.querySelector('.planner-column')?.dataset?.totalMinutes || '480');
+    const brick = document.createElement('div');
+    brick.className = 'order-brick';
+    brick.dataset.orderId = order.id;
+    brick.dataset.version = order.version;
+    brick.dataset.minutes = order.planned_minutes;
+    brick.style.backgroundColor = order.color;
+    brick.style.height = Math.round(order.planned_minutes / totalDayMinutes * 300) + 'px';
+    brick.title = `${order.title} - ${order.customer_first_name} (${order.planned_minutes} мин.)`;
+    const title = order.title.length > 20 ? order.title.slice(0, 19) + '…' : order.title;
+    brick.innerHTML = `
+        <a href="/orders/${order.id}/" class="order-link"><i class="fas fa-external-link-alt"></i></a>
+        <div class="order-content">
+            <h6>${escapeHtml(title)}</h6>
+            <p class="mb-1">${escapeHtml(order.customer_first_name)}</p>
+            <span class="minutes-badge">${order.planned_minutes} мин.</span>
+        </div>`;
+    return brick;
+}
+
+function refreshDayTotals(container) {
+    const column = container && container.closest('.planner-column');
+    if (!column) return;
+    const limit = parseInt(column.dataset.totalMinutes || '480');
+    let total = 0;
+    container.querySelectorAll('.order-brick').forEach(brick => {
+        total += parseInt(brick.dataset.minutes || '0');
+    });
+    const usage = column.querySelector('.time-usage');
+    if (usage) {
+        usage.textContent = `${total} / ${limit} мин.` + (total > limit ? ` (+${total - limit})` : '');
+    }
+    const bar = column.querySelector('.day-utilization');
+    if (bar) {
+        bar.style.width = Math.min(total / limit * 100, 100) + '%';
+    }
+    column.classList.toggle('over-limit', total > limit);
+}
+
+function applyOrderEvent(type, order) {
+    const existing = document.querySelector(`.order-brick[data-order-id="${order.id}"]`);
+    const oldContainer = existing && existing.parentElement;
+    
+    if (type === 'deleted') {
+        if (existing) {
+            existing.remove();
+            refreshDayTotals(oldContainer);
+        }
+        return;
+    }
+    
+    const target = order.planned_date
+        ? document.getElementById('orders-' + order.planned_date)
+        : document.getElementById('unplanned-orders');
+    const brick = buildOrderBrick(order);
+    if (existing) {
+        existing.remove();
+    }
+    if (target) {
+        target.querySelector('.empty-column-message')?.remove();
+        const siblings = target.querySelectorAll('.order-brick:not(.virtual-occurrence)');
+        const position = order.order_in_day;
+        if (position !== null && position !== undefined && position < siblings.length) {
+            target.insertBefore(brick, siblings[position]);
+        } else {
+            target.appendChild(brick);
+        }
+        refreshDayTotals(target);
+    }
+    if (oldContainer && oldContainer !== target) {
+        refreshDayTotals(oldContainer);
+    }
+}
+
+function connectPlannerEvents() {
+    // Живая синхронизация включена только при запуске через ASGI
+    if (!window.EventSource || !plannerConfig.eventsUrl) return;
+    const source = new EventSource(plannerConfig.eventsUrl);
+    ['created', 'updated', 'moved', 'deleted'].forEach(type => {
+        source.addEventListener(type, function(e) {
+            try {
+                applyOrderEvent(type, JSON.parse(e.data).order);
+            } catch (err) {
+                console.error('Ошибка применения события планера:', err);
+            }
+        });
+    });
+}
+
+document.addEventListener('DOMContentLoaded', connectPlannerEvents);
+
+console.log('JavaScript планера загружен');
@@ -0,0 +1,145 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils import timezone
+
+from .models import Category, ChangeLogEntry, Customer, Order, OrderStatus
+
+DEFAULT_SETTLE_SECONDS = 5
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+# Ключ в ответе API -> модель и компактный набор полей
+SYNC_MODELS = {
+    'orders': (Order, ('id', 'title', 'customer_id', 'category_id', 'status_id', 'price', 'comment',
+                       'planned_date', 'planned_minutes', 'planned_start_time', 'order_in_day',
+                       'color', 'version', 'updated_at')),
+    'customers': (Customer, ('id', 'first_name', 'last_name', 'phone', 'comment')),
+    'categories': (Category, ('id', 'name', 'default_price', 'color')),
+    'statuses': (OrderStatus, ('id', 'name', 'color', 'is_final')),
+}
+MODEL_KEYS = {model: key for key, (model, fields) in SYNC_MODELS.items()}
+
+
+def get_settle_seconds():
+    return getattr(settings, 'ATELIER_SYNC_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+
+def log_changes(user_id, key, object_ids, action):
+    """Пишет в журнал новые записи, удаляя прежние по тем же объектам"""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    ChangeLogEntry.objects.filter(user_id=user_id, model=key, object_id__in=object_ids).delete()
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(user_id=user_id, model=key, object_id=object_id, action=action)
+        for object_id in object_ids
+    ])
+
+def deleting_user(origin):
+    """Удаление начато с пользователя: его журнал удаляется каскадом, писать в него нечего"""
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+def object_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        log_changes(instance.user_id, MODEL_KEYS[sender], [instance.pk], ChangeLogEntry.ACTION_UPSERT)
+
+def object_deleted(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    log_changes(instance.user_id, MODEL_KEYS[sender], [instance.pk], ChangeLogEntry.ACTION_DELETE)
+
+def reference_deleting(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    # Заказы теряют категорию или статус через SET_NULL, то есть update() без сигналов
+    field = 'category' if sender is Category else 'status'
+    order_ids = Order.objects.filter(**{field: instance}).values_list('id', flat=True)
+    log_changes(instance.user_id, 'orders', order_ids, ChangeLogEntry.ACTION_UPSERT)
+
+for sync_model in MODEL_KEYS:
+    post_save.connect(object_saved, sender=sync_model, dispatch_uid=f'sync_saved_{sync_model.__name__}')
+    post_delete.connect(object_deleted, sender=sync_model, dispatch_uid=f'sync_deleted_{sync_model.__name__}')
+for sync_model in (Category, OrderStatus):
+    pre_delete.connect(reference_deleting, sender=sync_model, dispatch_uid=f'sync_references_{sync_model.__name__}')
+
+
+def serialize_objects(user, key, object_ids=None):
+    model, fields = SYNC_MODELS[key]
+    objects = model.objects.filter(user=user)
+    if object_ids is not None:
+        objects = objects.filter(id__in=object_ids)
+    return list(objects.order_by('id').values(*fields))
+
+def settled_before():
+    """Записи моложе этого момента могли получить id раньше, чем закоммитились соседние.
+
+    Курсор не сдвигается за них, и такие записи приходят повторно при
+    следующем запросе - применение изменений идемпотентно.
+    """
+    return timezone.now() - timedelta(seconds=get_settle_seconds())
+
+def get_snapshot(user):
+    """Полная выгрузка для клиента без курсора"""
+    # Курсор берется до чтения данных: изменения во время выгрузки придут следующим запросом
+    cursor = (ChangeLogEntry.objects
+              .filter(user=user, created_at__lt=settled_before())
+              .order_by('-id')
+              .values_list('id', flat=True)
+              .first()) or 0
+    return {
+        'cursor': cursor,
+        'has_more': False,
+        'snapshot': True,
+        'changes': {key: {'updated': serialize_objects(user, key), 'deleted': []} for key in SYNC_MODELS},
+    }
+
+def get_changes(user, cursor, limit=DEFAULT_LIMIT):
+    """Изменения после курсора: актуальные данные измененных объектов и id удаленных"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    entries = list(ChangeLogEntry.objects
+                   .filter(user=user, id__gt=cursor)
+                   .order_by('id')
+                   .values('id', 'model', 'object_id', 'action', 'created_at')[:limit + 1])
+    overflow = len(entries) > limit
+    entries = entries[:limit]
+
+    boundary = settled_before()
+    next_cursor = cursor
+    for entry in entries:
+        if entry['created_at'] >= boundary:
+            break
+        next_cursor = entry['id']
+
+    # По каждому объекту важно только последнее действие
+    latest = {}
+    for entry in entries:
+        latest[(entry['model'], entry['object_id'])] = entry['action']
+
+    changes = {key: {'updated': [], 'deleted': []} for key in SYNC_MODELS}
+    upserted = {key: [] for key in SYNC_MODELS}
+    for (key, object_id), action in latest.items():
+        if key not in SYNC_MODELS:
+            continue
+        if action == ChangeLogEntry.ACTION_UPSERT:
+            upserted[key].append(object_id)
+        else:
+            changes[key]['deleted'].append(object_id)
+
+    for key, object_ids in upserted.items():
+        if not object_ids:
+            continue
+        rows = serialize_objects(user, key, object_ids)
+        changes[key]['updated'] = rows
+        # Объект уже удален, а запись об удалении - за пределами этой страницы
+        found = {row['id'] for row in rows}
+        changes[key]['deleted'].extend(object_id for object_id in object_ids if object_id not in found)
+
+    return {
+        'cursor': next_cursor,
+        # Сразу запрашивать следующую страницу имеет смысл, только если курсор дошел до ее конца
+        'has_more': overflow and bool(entries) and next_cursor == entries[-1]['id'],
+        'snapshot': False,
+        'changes': changes,
+    }
@@ -0,0 +1,162 @@
+import datetime
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+
+from .db_router import (
+    PIN_COOKIE_NAME,
+    PRIMARY_DB_ALIAS,
+    REPLICA_DB_ALIAS,
+    PrimaryReplicaRouter,
+    ReplicaPinMiddleware,
+    pinned_to_primary,
+    replica_reads,
+    use_replica,
+)
+from .models import ChangeLogEntry, Customer, Order, OrderVersionConflict
+from .planning import move_order
+
+
+@mock.patch('atelier.db_router.replica_configured', return_value=True)
+class PrimaryReplicaRouterTests(TestCase):
+    """Маршрутизация запросов между основной базой и репликой.
+
+    Реплика в тестах - зеркало основной базы (TEST MIRROR), поэтому проверяется
+    выбор алиаса, а не содержимое баз: запросы к реплике не выполняются.
+    """
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        # Запись при создании тестовой базы закрепила чтения за основной базой;
+        # тест, как запрос в ReplicaPinMiddleware, начинается без закрепления
+        self.enterContext(pinned_to_primary(False))
+
+    def test_reads_go_to_primary_by_default(self, replica_configured):
+        self.assertEqual(self.router.db_for_read(Order), PRIMARY_DB_ALIAS)
+
+    def test_replica_reads_go_to_replica(self, replica_configured):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Order), REPLICA_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Order), PRIMARY_DB_ALIAS)
+
+    def test_reads_stay_on_primary_without_replica(self, replica_configured):
+        replica_configured.return_value = False
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Order), PRIMARY_DB_ALIAS)
+
+    def test_writes_always_go_to_primary(self, replica_configured):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Order), PRIMARY_DB_ALIAS)
+
+    def test_replica_is_not_migrated(self, replica_configured):
+        self.assertFalse(self.router.allow_migrate(REPLICA_DB_ALIAS, 'atelier'))
+        self.assertTrue(self.router.allow_migrate(PRIMARY_DB_ALIAS, 'atelier'))
+
+    def test_pinned_reads_go_to_primary(self, replica_configured):
+        with replica_reads(), pinned_to_primary():
+            self.assertEqual(self.router.db_for_read(Order), PRIMARY_DB_ALIAS)
+
+    def test_write_pins_following_reads_to_primary(self, replica_configured):
+        user = User.objects.create_user('pin')
+        # Блок - аналог следующего запроса: закрепление от create_user в него не переходит
+        with pinned_to_primary(False), replica_reads():
+            self.assertEqual(User.objects.all().db, REPLICA_DB_ALIAS)
+            user.first_name = 'Мастер'
+            user.save()
+            # Только что записанного на реплике может еще не быть
+            self.assertEqual(User.objects.all().db, PRIMARY_DB_ALIAS)
+
+    def test_use_replica_routes_only_safe_methods(self, replica_configured):
+        @use_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Order))
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get('/')).content.decode(), REPLICA_DB_ALIAS)
+        self.assertEqual(view(factory.post('/')).content.decode(), PRIMARY_DB_ALIAS)
+
+    def test_pin_middleware_stays_async(self, replica_configured):
+        async def view(request):
+            with replica_reads():
+                return HttpResponse(self.router.db_for_read(Order))
+
+        middleware = ReplicaPinMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        response = async_to_sync(middleware)(factory.get('/'))
+        self.assertEqual(response.content.decode(), REPLICA_DB_ALIAS)
+        response = async_to_sync(middleware)(factory.post('/'))
+        self.assertEqual(response.content.decode(), PRIMARY_DB_ALIAS)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+
+class MoveOrderTests(TransactionTestCase):
+    """Перенос заказов в планере: условный UPDATE по версии и перенумерация дня.
+
+    TransactionTestCase, чтобы select_for_update и atomic в move_order
+    работали с настоящими транзакциями, а не внутри транзакции теста.
+    """
+
+    day = datetime.date(2024, 3, 4)
+
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        customer = Customer.objects.create(user=self.user, first_name='Анна', last_name='Иванова')
+        self.orders = [
+            Order.objects.create(user=self.user, customer=customer, title=f'Заказ {index}', price=1000,
+                                 planned_date=self.day, order_in_day=index)
+            for index in range(3)
+        ]
+
+    def day_positions(self):
+        return list(Order.objects.filter(planned_date=self.day).order_by('order_in_day')
+                    .values_list('id', 'order_in_day'))
+
+    def test_move_renumbers_day_and_bumps_neighbours(self):
+        first, second, third = self.orders
+        versions, days = move_order(self.user, third.pk, self.day, 0, third.version)
+
+        self.assertEqual(days, [self.day])
+        self.assertEqual(self.day_positions(), [(third.pk, 0), (first.pk, 1), (second.pk, 2)])
+        current = dict(Order.objects.values_list('id', 'version'))
+        self.assertEqual(versions, {pk: current[pk] for pk in versions})
+        self.assertEqual(set(versions), {first.pk, second.pk, third.pk})
+        self.assertGreater(current[first.pk], first.version)
+
+    def test_stale_version_raises_conflict(self):
+        first, second, third = self.orders
+        move_order(self.user, third.pk, self.day, 0, third.version)
+
+        # Соседа сдвинули: его версия, прочитанная до переноса, устарела
+        with self.assertRaises(OrderVersionConflict):
+            move_order(self.user, first.pk, None, None, first.version)
+        self.assertEqual(self.day_positions(), [(third.pk, 0), (first.pk, 1), (second.pk, 2)])
+
+    def test_move_to_another_day_keeps_both_days_dense(self):
+        first, second, third = self.orders
+        next_day = self.day + datetime.timedelta(days=1)
+        versions, days = move_order(self.user, first.pk, next_day, 5, first.version)
+
+        self.assertEqual(days, [next_day, self.day])
+        self.assertEqual(self.day_positions(), [(second.pk, 0), (third.pk, 1)])
+        moved = Order.objects.get(pk=first.pk)
+        self.assertEqual((moved.planned_date, moved.order_in_day, moved.version),
+                         (next_day, 0, versions[first.pk]))
+
+
+class ChangeLogTests(TestCase):
+
+    def test_user_deletion_removes_change_log(self):
+        user = User.objects.create_user('removed')
+        customer = Customer.objects.create(user=user, first_name='Анна', last_name='Иванова')
+        Order.objects.create(user=user, customer=customer, title='Заказ', price=1000)
+        self.assertTrue(ChangeLogEntry.objects.filter(user=user).exists())
+
+        user_id = user.pk
+        user.delete()
+        # Записей об удалении заказа и клиента удаленного пользователя нет:
+        # иначе внешний ключ журнала не даст завершить транзакцию
+        self.assertFalse(ChangeLogEntry.objects.filter(user_id=user_id).exists())
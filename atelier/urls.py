@@ -11,6 +11,11 @@ urlpatterns = [
     # Main URLs
     path('', views.index, name='index'),
     path('update-order-planning/', views.update_order_planning, name='update_order_planning'),
+    path('day/<str:date>/', views.day_timeline, name='day_timeline'),
+    path('check-slot/', views.check_slot, name='check_slot'),
+    
+    path('search/', views.search, name='search'),
+    path('overview/', views.planner_overview, name='planner_overview'),
     
     # Order Status URLs
     path('order-statuses/', views.order_status_list, name='order_status_list'),
@@ -24,8 +29,17 @@ urlpatterns = [
     path('categories/<int:pk>/edit/', views.category_edit, name='category_edit'),
     path('categories/<int:pk>/delete/', views.category_delete, name='category_delete'),
     
+    # Recurring Order URLs
+    path('recurring-orders/', views.recurring_order_list, name='recurring_order_list'),
+    path('recurring-orders/create/', views.recurring_order_create, name='recurring_order_create'),
+    path('recurring-orders/<int:pk>/edit/', views.recurring_order_edit, name='recurring_order_edit'),
+    path('recurring-orders/<int:pk>/delete/', views.recurring_order_delete, name='recurring_order_delete'),
+    path('recurring-orders/<int:pk>/<str:date>/', views.recurring_occurrence_edit, name='recurring_occurrence_edit'),
+    
     # Planner Settings URLs
     path('settings/', views.planner_settings, name='planner_settings'),
+    path('settings/calendar/reset/', views.calendar_token_reset, name='calendar_token_reset'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     
     # Customer URLs
     path('customers/', views.customer_list, name='customer_list'),
@@ -36,13 +50,26 @@ urlpatterns = [
     
     # Order URLs
     path('orders/', views.order_list, name='order_list'),
+    path('orders/archive/', views.archived_order_list, name='archived_order_list'),
+    path('orders/archive/run/', views.archive_orders_now, name='archive_orders_now'),
+    path('orders/bulk/', views.order_bulk_action, name='order_bulk_action'),
     path('orders/<int:pk>/', views.order_detail, name='order_detail'),
     path('orders/create/', views.order_create, name='order_create'),
     path('orders/<int:pk>/edit/', views.order_edit, name='order_edit'),
     path('orders/<int:pk>/delete/', views.order_delete, name='order_delete'), 
+    path('orders/<int:pk>/restore/', views.order_restore, name='order_restore'),
+    path('orders/<int:pk>/schedule-slot/', views.schedule_order_slot, name='schedule_order_slot'),
+    path('orders/<int:pk>/clear-slot/', views.clear_order_slot, name='clear_order_slot'),
 
     path('api/category/<int:pk>/price/', views.get_category_price, name='category_price'),
     path('check-day-limit/', views.check_day_limit, name='check_day_limit'),
 
     path('customers/json/', views.customer_list_json, name='customer_list_json'),    
+
+    # Async planner API (под ASGI-сервером)
+    path('api/planner/', views.planner_data_async, name='planner_data_async'),
+    path('api/update-order-planning/', views.update_order_planning_async, name='update_order_planning_async'),
+    path('api/check-day-limit/', views.check_day_limit_async, name='check_day_limit_async'),
+    path('api/events/', views.order_events, name='order_events'),
+    path('api/changes/', views.sync_changes, name='sync_changes'),
 ]
\ No newline at end of file
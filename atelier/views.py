@@ -1,15 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.decorators.http import require_POST
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.core.paginator import Paginator
+from django.db.models import Count, F, Q, Sum
 from datetime import datetime, timedelta
+from functools import wraps
+import asyncio
+from asgiref.sync import sync_to_async
 import json
-from .models import Customer, Order, OrderStatus, PlannerSettings, Category
-from .forms import CustomerForm, OrderForm, OrderStatusForm, PlannerSettingsForm, CategoryForm, RegisterForm, LoginForm
-from django.template.loader import render_to_string
+from .models import Customer, Order, OrderStatus, PlannerSettings, Category, RecurringOrder, RecurringOrderSkip, ArchivedOrder, Job
+from . import bulk_actions
+from .archive import restore_order
+from .calendar_feed import feed_orders, feed_state, iter_feed
+from .db_router import use_replica
+from .jobs import enqueue
+from .middleware import public_view
+from .planning import OrderVersionConflict, move_order
+from .provisioning import get_planner_settings, provision_user
+from .search import search as search_index
+from .sync import DEFAULT_LIMIT as SYNC_DEFAULT_LIMIT, get_changes, get_snapshot
+from .scheduling import DayIntervals, minutes_to_time, time_to_minutes
+from .events import get_broker, publish_order_event, format_sse
+from .forms import CustomerForm, OrderForm, OrderStatusForm, PlannerSettingsForm, CategoryForm, RegisterForm, LoginForm, RecurringOrderForm, OrderBulkActionForm, VERSION_CONFLICT_MESSAGE
 
 # Auth views
 def register_view(request):
@@ -20,21 +43,10 @@ def register_view(request):
         form = RegisterForm(request.POST)
         if form.is_valid():
             try:
-                user = form.save()
-                
-                # Создаем дефолтные настройки
-                PlannerSettings.objects.create(user=user)
-                
-                # Создаем дефолтные статусы
-                default_statuses = [
-                    {'name': 'Новый', 'color': '#007bff', 'is_default': True},
-                    {'name': 'В работе', 'color': '#28a745', 'is_default': False},
-                    {'name': 'Завершен', 'color': "#ffffff", 'is_default': False},
-                    {'name': 'Отменен', 'color': '#6c757d', 'is_default': False}
-                ]
-                
-                for status_data in default_statuses:
-                    OrderStatus.objects.create(user=user, **status_data)
+                # Аккаунт создается целиком или не создается вовсе
+                with transaction.atomic():
+                    user = form.save()
+                    provision_user(user)
                 
                 login(request, user)
                 return redirect('index')
@@ -67,56 +79,64 @@ def logout_view(request):
     logout(request)
     return redirect('login')
 
-# Main views with user isolation
-@login_required
-def index(request):
-    # Получаем начальную дату из параметра или используем текущую
-    start_date_str = request.GET.get('start_date')
-    if start_date_str:
+def parse_start_date(value):
+    """Начальная дата планера из строки YYYY-MM-DD, по умолчанию - понедельник текущей недели"""
+    if value:
         try:
-            start_date = timezone.datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            # Если передан некорректный формат даты, используем текущую неделю
-            start_date = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
-    else:
-        start_date = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
-    
-    # Получаем количество недель или используем 1 по умолчанию
-    weeks_str = request.GET.get('weeks')
-    if weeks_str:
-        try:
-            weeks_to_show = max(1, int(weeks_str))  # Минимум 1 неделя
-        except ValueError:
-            weeks_to_show = 1
-    else:
-        weeks_to_show = 1
-    
-    planner_settings, created = PlannerSettings.objects.get_or_create(user=request.user)
-    orders = Order.objects.filter(user=request.user, planned_date__isnull=False).order_by('planned_date', 'order_in_day')
+            return timezone.datetime.strptime(value, '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            pass
+    today = timezone.now().date()
+    return today - timedelta(days=today.weekday())
+
+def parse_weeks(value):
+    """Количество недель в планере, минимум 1"""
+    try:
+        return max(1, int(value))
+    except (ValueError, TypeError):
+        return 1
+
+def build_planner_days(user, planner_settings, start_date, weeks):
+    """Дни планера с заказами и виртуальными повторениями"""
+    orders = Order.objects.filter(user=user, planned_date__isnull=False).order_by('planned_date', 'order_in_day')
     
     # Генерируем дни для отображения (недели)
     days_of_week = []
-    total_days = 7 * weeks_to_show
+    total_days = 7 * weeks
     
-    if planner_settings.work_days.strip():
-        work_days = list(map(int, planner_settings.work_days.split(',')))
-    else:
-        work_days = [1, 2, 3, 4, 5]
+    work_days = planner_settings.get_work_days()
+    end_date = start_date + timedelta(days=total_days - 1)
+    # Повторяющиеся заказы разворачиваются только для видимого окна
+    occurrences = RecurringOrder.expand_for_user(user, start_date, end_date, work_days)
     
     for i in range(total_days):
         day_date = start_date + timedelta(days=i)
         day_orders = orders.filter(planned_date=day_date)
+        day_occurrences = occurrences.get(day_date, [])
         
         total_minutes = sum(order.planned_minutes for order in day_orders)
+        total_minutes += sum(order.planned_minutes for order in day_occurrences)
         day_percentage = (total_minutes / (planner_settings.hours_per_day * 60)) * 100
         
         days_of_week.append({
             'date': day_date,
             'orders': day_orders,
+            'occurrences': day_occurrences,
             'is_work_day': (day_date.weekday() + 1) in work_days,
             'total_minutes': total_minutes,
             'day_percentage': min(day_percentage, 100)
         })
+    return days_of_week
+
+# Main views with user isolation
+@login_required
+def index(request):
+    # Получаем начальную дату и количество недель из параметров
+    start_date = parse_start_date(request.GET.get('start_date'))
+    weeks_to_show = parse_weeks(request.GET.get('weeks'))
+    
+    planner_settings = get_planner_settings(request.user)
+    days_of_week = build_planner_days(request.user, planner_settings, start_date, weeks_to_show)
     
     context = {
         'days': days_of_week,
@@ -126,6 +146,7 @@ def index(request):
         'start_date': start_date,
         'weeks': weeks_to_show,
         'end_date': start_date + timedelta(days=7 * weeks_to_show - 1),
+        'events_enabled': getattr(settings, 'ATELIER_EVENTS_ENABLED', False),
     }
     return render(request, 'atelier/index.html', context)
 
@@ -133,96 +154,124 @@ def index(request):
 @require_POST
 def update_order_planning(request):
     try:
-        data = json.loads(request.body)
-        order_id = data.get('order_id')
-        planned_date = data.get('planned_date')
-        order_in_day = data.get('order_in_day')
-        
-        # Получаем параметры с проверкой на None
-        start_date_str = data.get('start_date')
-        weeks_str = data.get('weeks', '1')
-        
-        # Обработка параметров как в index view
-        if start_date_str:
-            try:
-                start_date = timezone.datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                start_date = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
-        else:
-            start_date = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
-        
-        try:
-            weeks = max(1, int(weeks_str))
-        except (ValueError, TypeError):
-            weeks = 1
-        
-        order = get_object_or_404(Order, id=order_id, user=request.user)
-        
-        if planned_date:
-            order.planned_date = planned_date
-        else:
-            order.planned_date = None
+        order_id, planned_date, order_in_day, version = parse_move_request(json.loads(request.body))
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Invalid data'}, status=400)
+    
+    # Вместо HTML всего планера - состояние заказа и затронутых дней (или конфликт)
+    response, status = planner_move_response(request.user, order_id, planned_date, order_in_day, version)
+    return JsonResponse(response, status=status)
 
-        # Исправляем обработку order_in_day
-        if order_in_day is not None and order_in_day != '':
-            try:
-                order.order_in_day = int(order_in_day)
-            except (ValueError, TypeError):
-                order.order_in_day = None
-        else:
-            order.order_in_day = None
-        
-        order.save()
-        
-        # Если это AJAX-запрос, возвращаем HTML всего планера
-        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            planner_settings = PlannerSettings.objects.get(user=request.user)
-            orders = Order.objects.filter(user=request.user, planned_date__isnull=False).order_by('planned_date', 'order_in_day')
-            
-            days_of_week = []
-            total_days = 7 * weeks
-            
-            if planner_settings.work_days.strip():
-                work_days = list(map(int, planner_settings.work_days.split(',')))
-            else:
-                work_days = [1, 2, 3, 4, 5]
-            
-            for i in range(total_days):
-                day_date = start_date + timedelta(days=i)
-                day_orders = orders.filter(planned_date=day_date)
-                
-                total_minutes = sum(order.planned_minutes for order in day_orders)
-                day_percentage = (total_minutes / (planner_settings.hours_per_day * 60)) * 100
-                
-                days_of_week.append({
-                    'date': day_date,
-                    'orders': day_orders,
-                    'is_work_day': (day_date.weekday() + 1) in work_days,
-                    'total_minutes': total_minutes,
-                    'day_percentage': min(day_percentage, 100)
-                })
-            
-            html = render_to_string('atelier/index.html', {
-                'days': days_of_week,
-                'planner_settings': planner_settings,
-                'orders_without_date': Order.objects.filter(user=request.user, planned_date__isnull=True),
-                'total_day_minutes': planner_settings.hours_per_day * 60,
-                'start_date': start_date,
-                'weeks': weeks
-            }, request=request)
-            
-            return JsonResponse({'success': True, 'html': html})
-        
-        return JsonResponse({'success': True})
-        
-    except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+OVERVIEW_PERIODS = {'month': 1, 'quarter': 3}
+# Границы загрузки дня (в процентах) для уровней цвета тепловой карты
+OVERVIEW_HEAT_LEVELS = (25, 50, 75, 100)
+
+def add_months(day_date, months):
+    month_index = day_date.year * 12 + day_date.month - 1 + months
+    return day_date.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+def build_overview_months(user, planner_settings, first_month, months):
+    """Месяцы обзора: по каждому дню только числа - минуты, заказы, состав по статусам"""
+    end_date = add_months(first_month, months) - timedelta(days=1)
+    day_minutes_limit = planner_settings.hours_per_day * 60
+    work_days = planner_settings.get_work_days()
+    
+    # Один GROUP BY по (день, статус) на таблицу вместо загрузки карточек заказов;
+    # архивные заказы прошедших месяцев тоже занимали время дня
+    stats = {}
+    for model in (Order, ArchivedOrder):
+        rows = (model.objects
+                .filter(user=user, planned_date__range=(first_month, end_date))
+                .values('planned_date', 'status_id')
+                .annotate(minutes=Sum('planned_minutes'), count=Count('id'))
+                .order_by())
+        for row in rows:
+            day = stats.setdefault(row['planned_date'], {'minutes': 0, 'count': 0, 'statuses': {}})
+            day['minutes'] += row['minutes'] or 0
+            day['count'] += row['count']
+            day_statuses = day['statuses']
+            day_statuses[row['status_id']] = day_statuses.get(row['status_id'], 0) + row['count']
+    
+    # Виртуальные повторения тоже занимают время дня
+    for day_date, occurrences in RecurringOrder.expand_for_user(user, first_month, end_date, work_days).items():
+        day = stats.setdefault(day_date, {'minutes': 0, 'count': 0, 'statuses': {}})
+        day['minutes'] += sum(occurrence.planned_minutes for occurrence in occurrences)
+        day['count'] += len(occurrences)
+        day['recurring'] = len(occurrences)
+    
+    statuses = {status.pk: status for status in OrderStatus.objects.filter(user=user)}
+    
+    result = []
+    for index in range(months):
+        month_start = add_months(first_month, index)
+        month_end = add_months(month_start, 1) - timedelta(days=1)
+        # Сетка недель с понедельника, пустые ячейки - дни соседних месяцев
+        weeks = [[None] * month_start.weekday()]
+        day_date = month_start
+        while day_date <= month_end:
+            if len(weeks[-1]) == 7:
+                weeks.append([])
+            day = stats.get(day_date, {'minutes': 0, 'count': 0, 'statuses': {}})
+            percentage = day['minutes'] / day_minutes_limit * 100 if day_minutes_limit else 0
+            weeks[-1].append({
+                'date': day_date,
+                'week_start': day_date - timedelta(days=day_date.weekday()),
+                'minutes': day['minutes'],
+                'count': day['count'],
+                'recurring': day.get('recurring', 0),
+                'percentage': round(percentage),
+                'heat': 'over' if percentage > 100 else sum(percentage > level for level in OVERVIEW_HEAT_LEVELS),
+                'is_work_day': (day_date.weekday() + 1) in work_days,
+                'is_today': day_date == timezone.localdate(),
+                'statuses': [
+                    {'status': statuses.get(status_id), 'count': count}
+                    for status_id, count in sorted(day['statuses'].items(), key=lambda item: -item[1])
+                ],
+            })
+            day_date += timedelta(days=1)
+        weeks[-1] += [None] * (7 - len(weeks[-1]))
+        minutes = sum(cell['minutes'] for week in weeks for cell in week if cell)
+        result.append({
+            'start': month_start,
+            'weeks': weeks,
+            'minutes': minutes,
+            'count': sum(cell['count'] for week in weeks for cell in week if cell),
+            'hours': round(minutes / 60),
+        })
+    return result
+
+@login_required
+@use_replica
+def planner_overview(request):
+    period = request.GET.get('period', 'month')
+    if period not in OVERVIEW_PERIODS:
+        period = 'month'
+    months = OVERVIEW_PERIODS[period]
+    try:
+        first_month = datetime.strptime(request.GET.get('start', ''), '%Y-%m').date()
+    except ValueError:
+        first_month = timezone.localdate().replace(day=1)
+    
+    # Страница только читает: без сохраненных настроек берем значения по умолчанию
+    planner_settings = PlannerSettings.objects.filter(user=request.user).first() or PlannerSettings(user=request.user)
+    return render(request, 'atelier/planner_overview.html', {
+        'period': period,
+        'months': build_overview_months(request.user, planner_settings, first_month, months),
+        'first_month': first_month,
+        'prev_month': add_months(first_month, -months),
+        'next_month': add_months(first_month, months),
+        'total_day_minutes': planner_settings.hours_per_day * 60,
+    })
 
 # Order Status views
 @login_required
+@use_replica
 def order_status_list(request):
     statuses = OrderStatus.objects.filter(user=request.user)
-    return render(request, 'atelier/order_status_list.html', {'statuses': statuses})
+    return render(request, 'atelier/order_status_list.html', {
+        'statuses': statuses,
+        'default_status_id': PlannerSettings.get_default_status_id(request.user.pk)
+    })
 
 @login_required
 def order_status_create(request):
@@ -231,12 +280,11 @@ def order_status_create(request):
         if form.is_valid():
             status = form.save(commit=False)
             status.user = request.user
+            status.save()
             
-            # Если устанавливается как статус по умолчанию, снимаем флаг с других
+            # Статус по умолчанию переключается одной записью в настройках
             if form.cleaned_data['is_default']:
-                OrderStatus.objects.filter(user=request.user, is_default=True).update(is_default=False)
-            
-            status.save()
+                PlannerSettings.set_default_status(request.user, status)
             return redirect('order_status_list')
     else:
         form = OrderStatusForm()
@@ -248,9 +296,12 @@ def order_status_edit(request, pk):
     if request.method == 'POST':
         form = OrderStatusForm(request.POST, instance=status)
         if form.is_valid():
-            if form.cleaned_data['is_default']:
-                OrderStatus.objects.filter(user=request.user, is_default=True).update(is_default=False)
-            form.save()
+            status = form.save()
+            is_current_default = PlannerSettings.get_default_status_id(request.user.pk) == status.pk
+            if form.cleaned_data['is_default'] and not is_current_default:
+                PlannerSettings.set_default_status(request.user, status)
+            elif not form.cleaned_data['is_default'] and is_current_default:
+                PlannerSettings.set_default_status(request.user, None)
             return redirect('order_status_list')
     else:
         form = OrderStatusForm(instance=status)
@@ -266,6 +317,7 @@ def order_status_delete(request, pk):
 
 # Category views
 @login_required
+@use_replica
 def category_list(request):
     categories = Category.objects.filter(user=request.user)
     return render(request, 'atelier/category_list.html', {'categories': categories})
@@ -306,28 +358,127 @@ def category_delete(request, pk):
 # Planner Settings views
 @login_required
 def planner_settings(request):
-    settings, created = PlannerSettings.objects.get_or_create(user=request.user)
+    planner_settings_obj = get_planner_settings(request.user)
     
     if request.method == 'POST':
-        form = PlannerSettingsForm(request.POST, instance=settings)
+        form = PlannerSettingsForm(request.POST, instance=planner_settings_obj)
         if form.is_valid():
             form.save()
             return redirect('index')
     else:
-        form = PlannerSettingsForm(instance=settings)
+        form = PlannerSettingsForm(instance=planner_settings_obj)
     
-    return render(request, 'atelier/planner_settings.html', {'form': form})
+    # Токен выдается только по кнопке (calendar_token_reset): GET ничего не пишет в базу
+    calendar_url = None
+    if planner_settings_obj.calendar_token:
+        calendar_url = request.build_absolute_uri(reverse('calendar_feed', args=[planner_settings_obj.calendar_token]))
+    return render(request, 'atelier/planner_settings.html', {'form': form, 'calendar_url': calendar_url})
+
+@login_required
+@require_POST
+def calendar_token_reset(request):
+    planner_settings_obj = get_planner_settings(request.user)
+    if planner_settings_obj.calendar_token:
+        planner_settings_obj.reset_calendar_token()
+        messages.success(request, 'Ссылка на календарь обновлена. Старая ссылка больше не работает')
+    else:
+        planner_settings_obj.get_calendar_token()
+        messages.success(request, 'Ссылка на календарь создана')
+    return redirect('planner_settings')
+
+# Без @login_required: календарные приложения не входят в аккаунт, доступ - по токену в ссылке
+@public_view
+@use_replica
+def calendar_feed(request, token):
+    user_id = PlannerSettings.objects.filter(calendar_token=token).values_list('user_id', flat=True).first()
+    if user_id is None:
+        raise Http404
+
+    # Клиенты опрашивают ленту каждые несколько минут: без изменений отвечаем 304 по двум агрегатам
+    etag, last_modified = feed_state(user_id)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        window_start, orders = feed_orders(user_id)
+        # Тело отдается после выхода из представления: фиксируем базу, выбранную сейчас
+        orders = orders.using(orders.db)
+        response = StreamingHttpResponse(
+            iter_feed(orders, request.get_host().split(':')[0], 'Заказы ателье'),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="orders.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Лента приватная: общие кеши не должны хранить ее
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 # Customer views
+CUSTOMERS_PER_PAGE = 50
+# Ключ сортировки в URL -> поля аннотированного queryset
+CUSTOMER_SORT_FIELDS = {
+    'name': ['last_name', 'first_name'],
+    'created_at': ['created_at'],
+    'orders': ['order_count'],
+    'open': ['open_order_count'],
+    'last_order': ['last_order_at'],
+    'revenue': ['revenue'],
+}
+
 @login_required
+@use_replica
 def customer_list(request):
-    customers = Customer.objects.filter(user=request.user)
-    return render(request, 'atelier/customer_list.html', {'customers': customers})
+    customers = Customer.objects.filter(user=request.user).with_order_stats()
+    
+    query = request.GET.get('q', '').strip()
+    if query:
+        customers = customers.filter(
+            Q(first_name__icontains=query) | Q(last_name__icontains=query) | Q(phone__icontains=query)
+        )
+    
+    show = request.GET.get('show', '')
+    if show == 'open':
+        customers = customers.filter(open_order_count__gt=0)
+    elif show == 'no_orders':
+        customers = customers.filter(order_count=0)
+    
+    sort = request.GET.get('sort', '')
+    if sort.lstrip('-') not in CUSTOMER_SORT_FIELDS:
+        sort = '-created_at'
+    ordering = CUSTOMER_SORT_FIELDS[sort.lstrip('-')]
+    if sort.startswith('-'):
+        ordering = [F(field).desc(nulls_last=True) for field in ordering]
+    else:
+        ordering = [F(field).asc(nulls_last=True) for field in ordering]
+    customers = customers.order_by(*ordering, '-pk')
+    
+    page = Paginator(customers, CUSTOMERS_PER_PAGE).get_page(request.GET.get('page'))
+    params = request.GET.copy()
+    params.pop('page', None)
+    sort_params = params.copy()
+    sort_params.pop('sort', None)
+    return render(request, 'atelier/customer_list.html', {
+        'customers': page,
+        'page': page,
+        'query': query,
+        'show': show,
+        'sort': sort,
+        'page_query': params.urlencode(),
+        'sort_query': sort_params.urlencode(),
+    })
 
 @login_required
+@use_replica
 def customer_detail(request, pk):
-    customer = get_object_or_404(Customer, pk=pk, user=request.user)
-    orders = customer.orders.filter(user=request.user)
+    customer = get_object_or_404(Customer.objects.with_order_stats(), pk=pk, user=request.user)
+    # История клиента читается из основной таблицы и из архива
+    orders = sorted(
+        list(customer.orders.filter(user=request.user).select_related('status'))
+        + list(customer.archived_orders.filter(user=request.user).select_related('status')),
+        key=lambda order: order.created_at,
+        reverse=True
+    )
     return render(request, 'atelier/customer_detail.html', {
         'customer': customer,
         'orders': orders
@@ -336,26 +487,26 @@ def customer_detail(request, pk):
 @login_required
 def customer_create(request):
     if request.method == 'POST':
-        form = CustomerForm(request.POST)
+        form = CustomerForm(request.POST, user=request.user)
         if form.is_valid():
             customer = form.save(commit=False)
             customer.user = request.user
             customer.save()
             return redirect('customer_detail', pk=customer.pk)
     else:
-        form = CustomerForm()
+        form = CustomerForm(user=request.user)
     return render(request, 'atelier/customer_form.html', {'form': form})
 
 @login_required
 def customer_edit(request, pk):
     customer = get_object_or_404(Customer, pk=pk, user=request.user)
     if request.method == 'POST':
-        form = CustomerForm(request.POST, instance=customer)
+        form = CustomerForm(request.POST, instance=customer, user=request.user)
         if form.is_valid():
             form.save()
             return redirect('customer_detail', pk=customer.pk)
     else:
-        form = CustomerForm(instance=customer)
+        form = CustomerForm(instance=customer, user=request.user)
     return render(request, 'atelier/customer_form.html', {'form': form})
 
 @login_required
@@ -367,15 +518,87 @@ def customer_delete(request, pk):
 
 # Order views
 @login_required
+@use_replica
 def order_list(request):
-    orders = Order.objects.filter(user=request.user)
-    return render(request, 'atelier/order_list.html', {'orders': orders})
+    orders = Order.objects.filter(user=request.user).select_related('customer', 'category', 'status')
+    return render(request, 'atelier/order_list.html', {
+        'orders': orders,
+        'bulk_form': OrderBulkActionForm(user=request.user),
+    })
+
+@login_required
+@require_POST
+def order_bulk_action(request):
+    form = OrderBulkActionForm(request.POST, user=request.user)
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if not form.is_valid():
+        error = '; '.join(message for errors in form.errors.values() for message in errors)
+        if is_ajax:
+            return JsonResponse({'success': False, 'error': error}, status=400)
+        messages.error(request, error)
+        return redirect('order_list')
+    
+    action = form.cleaned_data['action']
+    order_ids = form.cleaned_data['order_ids']
+    if action == 'set_status':
+        count = bulk_actions.set_status(request.user, order_ids, form.cleaned_data['status'])
+    elif action == 'set_category':
+        count = bulk_actions.set_category(request.user, order_ids, form.cleaned_data['category'])
+    elif action == 'reschedule':
+        count = bulk_actions.reschedule(request.user, order_ids, form.cleaned_data['planned_date'])
+    elif action == 'unschedule':
+        count = bulk_actions.reschedule(request.user, order_ids, None)
+    else:
+        count = bulk_actions.delete_orders(request.user, order_ids)
+    
+    if is_ajax:
+        return JsonResponse({'success': True, 'action': action, 'count': count})
+    label = dict(OrderBulkActionForm.ACTION_CHOICES)[action]
+    messages.success(request, f'{label}: обработано заказов - {count}')
+    return redirect('order_list')
 
 @login_required
 def order_detail(request, pk):
-    order = get_object_or_404(Order, pk=pk, user=request.user)
+    order = Order.objects.filter(pk=pk, user=request.user).first()
+    if order is None:
+        # id сохраняется при архивации, поэтому старые ссылки ведут в архив
+        order = get_object_or_404(ArchivedOrder, pk=pk, user=request.user)
     return render(request, 'atelier/order_detail.html', {'order': order})
 
+@login_required
+@use_replica
+def archived_order_list(request):
+    orders = ArchivedOrder.objects.filter(user=request.user).select_related('customer', 'category', 'status')
+    return render(request, 'atelier/archived_order_list.html', {'orders': orders})
+
+@login_required
+@require_POST
+def archive_orders_now(request):
+    # Архивация идет пачками и может занять время, поэтому выполняется воркером
+    queued = Job.objects.filter(
+        name='archive_orders',
+        status__in=[Job.STATUS_PENDING, Job.STATUS_RUNNING],
+        payload__user_id=request.user.pk,
+    ).exists()
+    if not queued:
+        enqueue('archive_orders', {'user_id': request.user.pk})
+    messages.success(request, 'Архивация запущена: давно завершенные заказы появятся здесь через несколько минут')
+    return redirect('archived_order_list')
+
+@login_required
+@require_POST
+def order_restore(request, pk):
+    archived_order = get_object_or_404(ArchivedOrder, pk=pk, user=request.user)
+    try:
+        order = restore_order(archived_order)
+    except IntegrityError:
+        # Id архивного заказа уже занят новым заказом (MySQL до 8.0 после перезапуска
+        # начинает AUTO_INCREMENT с максимального id в таблице)
+        messages.error(request, f'Не удалось восстановить заказ «{archived_order.title}»: его номер уже занят другим заказом')
+        return redirect('archived_order_list')
+    publish_order_event(order, 'created')
+    return redirect('order_detail', pk=order.pk)
+
 @login_required
 def order_create(request):
     # Получаем дату из параметра URL
@@ -392,6 +615,7 @@ def order_create(request):
                 order.planned_date = form.cleaned_data['planned_date']
             
             order.save()
+            publish_order_event(order, 'created')
             return redirect('index')
     else:
         # Создаем форму с начальными значениями
@@ -413,8 +637,13 @@ def order_edit(request, pk):
     if request.method == 'POST':
         form = OrderForm(request.POST, instance=order, user=request.user)
         if form.is_valid():
-            order = form.save()
-            return redirect('index')
+            try:
+                order = form.save()
+            except OrderVersionConflict:
+                form.add_error(None, VERSION_CONFLICT_MESSAGE)
+            else:
+                publish_order_event(order, 'updated')
+                return redirect('index')
     else:
         form = OrderForm(instance=order, user=request.user)
     return render(request, 'atelier/order_form.html', {'form': form})
@@ -423,9 +652,254 @@ def order_edit(request, pk):
 @require_POST
 def order_delete(request, pk):
     order = get_object_or_404(Order, pk=pk, user=request.user)
+    if order.recurring_order_id and order.occurrence_date:
+        # Иначе удаленное повторение снова появится в планере
+        RecurringOrderSkip.objects.get_or_create(recurring_order_id=order.recurring_order_id, date=order.occurrence_date)
+    publish_order_event(order, 'deleted')
     order.delete()
     return redirect('order_list')
 
+# Recurring order views
+@login_required
+@use_replica
+def recurring_order_list(request):
+    recurring_orders = RecurringOrder.objects.filter(user=request.user).select_related('customer', 'category')
+    return render(request, 'atelier/recurring_order_list.html', {'recurring_orders': recurring_orders})
+
+@login_required
+def recurring_order_create(request):
+    if request.method == 'POST':
+        form = RecurringOrderForm(request.POST, user=request.user)
+        if form.is_valid():
+            recurring_order = form.save(commit=False)
+            recurring_order.user = request.user
+            recurring_order.save()
+            return redirect('recurring_order_list')
+    else:
+        form = RecurringOrderForm(user=request.user, initial={'start_date': timezone.now().date()})
+    return render(request, 'atelier/recurring_order_form.html', {'form': form})
+
+@login_required
+def recurring_order_edit(request, pk):
+    recurring_order = get_object_or_404(RecurringOrder, pk=pk, user=request.user)
+    if request.method == 'POST':
+        form = RecurringOrderForm(request.POST, instance=recurring_order, user=request.user)
+        if form.is_valid():
+            form.save()
+            return redirect('recurring_order_list')
+    else:
+        form = RecurringOrderForm(instance=recurring_order, user=request.user)
+    return render(request, 'atelier/recurring_order_form.html', {'form': form})
+
+@login_required
+@require_POST
+def recurring_order_delete(request, pk):
+    recurring_order = get_object_or_404(RecurringOrder, pk=pk, user=request.user)
+    # Материализованные повторения остаются обычными заказами (SET_NULL)
+    recurring_order.delete()
+    return redirect('recurring_order_list')
+
+@login_required
+def recurring_occurrence_edit(request, pk, date):
+    """Редактирование повторения: настоящий заказ создается только при сохранении формы"""
+    recurring_order = get_object_or_404(RecurringOrder, pk=pk, user=request.user)
+    try:
+        occurrence_date = timezone.datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return redirect('index')
+    
+    planner_settings = get_planner_settings(request.user)
+    dates = recurring_order.occurrence_dates(occurrence_date, occurrence_date, planner_settings.get_work_days())
+    if occurrence_date not in dates:
+        return redirect('index')
+    
+    existing = Order.objects.filter(recurring_order=recurring_order, occurrence_date=occurrence_date).first()
+    if existing:
+        return redirect('order_edit', pk=existing.pk)
+    
+    # GET только показывает форму: ссылки из планера открывают ее без побочных эффектов
+    occurrence = recurring_order.build_occurrence(occurrence_date)
+    if request.method == 'POST':
+        form = OrderForm(request.POST, instance=occurrence, user=request.user)
+        if form.is_valid():
+            try:
+                with transaction.atomic():
+                    order = form.save()
+            except IntegrityError:
+                # Повторение уже сохранили в другом окне
+                existing = Order.objects.get(recurring_order=recurring_order, occurrence_date=occurrence_date)
+                return redirect('order_edit', pk=existing.pk)
+            publish_order_event(order, 'created')
+            return redirect('index')
+    else:
+        initial = {}
+        if occurrence.customer_id:
+            initial = {
+                'customer_first_name': occurrence.customer.first_name,
+                'customer_phone': occurrence.customer.phone,
+            }
+        form = OrderForm(instance=occurrence, user=request.user, initial=initial)
+    return render(request, 'atelier/order_form.html', {'form': form})
+
+# Day timeline (time slots)
+def build_day_index(user, planner_settings, day_date, exclude_pk=None):
+    """Занятые слоты дня одним легким запросом (только id, начало, длительность)"""
+    day_start, day_end = planner_settings.get_day_bounds()
+    slots = (Order.objects
+             .filter(user=user, planned_date=day_date, planned_start_time__isnull=False)
+             .exclude(pk=exclude_pk)
+             .values_list('id', 'planned_start_time', 'planned_minutes'))
+    return DayIntervals.from_orders(slots, day_start, day_end)
+
+@login_required
+def day_timeline(request, date):
+    try:
+        day_date = timezone.datetime.strptime(date, '%Y-%m-%d').date()
+    except ValueError:
+        return redirect('index')
+    
+    planner_settings = get_planner_settings(request.user)
+    day_start, day_end = planner_settings.get_day_bounds()
+    day_length = max(day_end - day_start, 1)
+    
+    orders = (Order.objects
+              .filter(user=request.user, planned_date=day_date)
+              .select_related('customer', 'status')
+              .order_by('planned_start_time', 'order_in_day'))
+    timed_orders = []
+    untimed_orders = []
+    for order in orders:
+        if order.planned_start_time:
+            start = time_to_minutes(order.planned_start_time)
+            # Положение блока на шкале в процентах от рабочего дня
+            order.timeline_top = max(0, (start - day_start) / day_length * 100)
+            order.timeline_height = max(order.planned_minutes / day_length * 100, 2)
+            timed_orders.append(order)
+        else:
+            untimed_orders.append(order)
+    
+    day_index = DayIntervals.from_orders(timed_orders, day_start, day_end)
+    free_gaps = [
+        {'start': minutes_to_time(start), 'end': minutes_to_time(end), 'minutes': end - start}
+        for start, end in day_index.free_gaps()
+    ]
+    hours = [
+        {'label': f'{minute // 60:02d}:00', 'top': (minute - day_start) / day_length * 100}
+        for minute in range((day_start + 59) // 60 * 60, day_end + 1, 60)
+    ]
+    
+    return render(request, 'atelier/day_timeline.html', {
+        'day_date': day_date,
+        'timed_orders': timed_orders,
+        'untimed_orders': untimed_orders,
+        'free_gaps': free_gaps,
+        'hours': hours,
+        'day_start': minutes_to_time(day_start),
+        'day_end': minutes_to_time(day_end),
+    })
+
+@login_required
+@require_POST
+def check_slot(request):
+    """Помещается ли заказ в слот: {'fits': ..., 'conflicts': [...], 'next_free': 'HH:MM'}"""
+    try:
+        data = json.loads(request.body)
+        order = get_object_or_404(Order, id=data.get('order_id'), user=request.user)
+        planned_date = timezone.datetime.strptime(data.get('planned_date'), '%Y-%m-%d').date()
+        start_time = timezone.datetime.strptime(data.get('start_time'), '%H:%M').time()
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'fits': False, 'error': str(e)}, status=400)
+    
+    planner_settings = get_planner_settings(request.user)
+    start = time_to_minutes(start_time)
+    
+    # Конфликты и ближайшее свободное окно - из одного запроса слотов дня
+    day_index = build_day_index(request.user, planner_settings, planned_date, exclude_pk=order.pk)
+    conflicts = day_index.conflicts(start, start + order.planned_minutes)
+    in_work_hours = day_index.in_work_hours(start, order.planned_minutes)
+    
+    response = {
+        'fits': not conflicts and in_work_hours,
+        'conflicts': conflicts,
+        'in_work_hours': in_work_hours,
+    }
+    if not response['fits']:
+        next_free = day_index.next_free_slot(order.planned_minutes, not_before=start)
+        response['next_free'] = minutes_to_time(next_free).strftime('%H:%M') if next_free is not None else None
+    return JsonResponse(response)
+
+@login_required
+@require_POST
+def schedule_order_slot(request, pk):
+    """Ставит заказ на время: на указанное или в ближайшее свободное окно дня"""
+    order = get_object_or_404(Order, pk=pk, user=request.user)
+    if not order.planned_date:
+        return redirect('order_detail', pk=order.pk)
+    
+    planner_settings = get_planner_settings(request.user)
+    day_index = build_day_index(request.user, planner_settings, order.planned_date, exclude_pk=order.pk)
+    
+    start = None
+    start_time_str = request.POST.get('start_time')
+    if start_time_str:
+        try:
+            requested = time_to_minutes(timezone.datetime.strptime(start_time_str, '%H:%M').time())
+        except ValueError:
+            messages.error(request, f'Не удалось разобрать время «{start_time_str}», укажите ЧЧ:ММ')
+        else:
+            if day_index.fits(requested, order.planned_minutes):
+                start = requested
+            else:
+                next_free = day_index.next_free_slot(order.planned_minutes, not_before=requested)
+                if next_free is not None:
+                    messages.error(request, f'Время {start_time_str} занято, ближайшее свободное - '
+                                            f'{minutes_to_time(next_free):%H:%M}')
+                else:
+                    messages.error(request, f'Время {start_time_str} занято, позже в этот день '
+                                            f'нет свободного окна на {order.planned_minutes} мин')
+    else:
+        start = day_index.next_free_slot(order.planned_minutes)
+        if start is None:
+            messages.error(request, f'В этот день нет свободного окна на {order.planned_minutes} мин')
+    
+    if start is not None:
+        order.planned_start_time = minutes_to_time(start)
+        try:
+            order.save()
+        except OrderVersionConflict:
+            # Слот считался по устаревшему заказу: пусть мастер посмотрит на новый день
+            messages.error(request, VERSION_CONFLICT_MESSAGE)
+        else:
+            publish_order_event(order, 'updated')
+    
+    return redirect('day_timeline', date=order.planned_date.strftime('%Y-%m-%d'))
+
+@login_required
+@require_POST
+def clear_order_slot(request, pk):
+    order = get_object_or_404(Order, pk=pk, user=request.user)
+    order.planned_start_time = None
+    try:
+        order.save()
+    except OrderVersionConflict:
+        messages.error(request, VERSION_CONFLICT_MESSAGE)
+    else:
+        publish_order_event(order, 'updated')
+    if order.planned_date:
+        return redirect('day_timeline', date=order.planned_date.strftime('%Y-%m-%d'))
+    return redirect('index')
+
+@login_required
+@use_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = search_index(request.user, query) if query else {'orders': [], 'customers': []}
+    return render(request, 'atelier/search.html', {
+        'query': query,
+        'orders': results['orders'],
+        'customers': results['customers'],
+    })
+
 @login_required
 def get_category_price(request, pk):
     try:
@@ -434,6 +908,11 @@ def get_category_price(request, pk):
     except Category.DoesNotExist:
         return JsonResponse({'error': 'Category not found'}, status=404)
     
+def get_occurrence_minutes(user, day_date, work_days):
+    """Минуты виртуальных повторений дня: они занимают время, хотя заказов еще нет"""
+    occurrences = RecurringOrder.expand_for_user(user, day_date, day_date, work_days)
+    return sum(occurrence.planned_minutes for occurrence in occurrences.get(day_date, []))
+
 @login_required
 @require_POST
 def check_day_limit(request):
@@ -447,6 +926,7 @@ def check_day_limit(request):
         planner_settings = get_object_or_404(PlannerSettings, user=request.user)
         
         if planned_date:
+            planned_date = datetime.strptime(planned_date, '%Y-%m-%d').date()
             day_orders = Order.objects.filter(planned_date=planned_date, user=request.user)
             total_minutes = sum(o.planned_minutes for o in day_orders if o.planned_minutes)
             
@@ -454,6 +934,8 @@ def check_day_limit(request):
                 total_minutes -= order.planned_minutes or 0
             
             total_minutes += order.planned_minutes or 0
+            # Виртуальные повторения тоже занимают время дня
+            total_minutes += get_occurrence_minutes(request.user, planned_date, planner_settings.get_work_days())
             
             day_minutes_limit = planner_settings.hours_per_day * 60
             can_add = total_minutes <= day_minutes_limit
@@ -469,6 +951,238 @@ def check_day_limit(request):
         return JsonResponse({'can_add': True, 'error': str(e)})
     
 @login_required
+@use_replica
 def customer_list_json(request):
     customers = Customer.objects.filter(user=request.user).values('id', 'first_name', 'phone')
-    return JsonResponse(list(customers), safe=False)    
\ No newline at end of file
+    return JsonResponse(list(customers), safe=False)    
+
+@login_required
+def sync_changes(request):
+    """Дельта-синхронизация: без курсора - полная выгрузка, с курсором - только изменения после него"""
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return JsonResponse(get_snapshot(request.user))
+    try:
+        cursor = int(cursor)
+        limit = int(request.GET.get('limit', SYNC_DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid cursor or limit'}, status=400)
+    return JsonResponse(get_changes(request.user, cursor, limit))
+# Async planner API (ASGI)
+PLANNER_ORDER_FIELDS = ('id', 'title', 'customer__first_name', 'planned_date', 'planned_minutes',
+                        'order_in_day', 'color', 'status_id', 'version')
+
+def async_login_required(view_func):
+    """Аналог login_required для async-представлений, отвечает JSON вместо редиректа"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+def serialize_planner_order(values):
+    return {
+        'id': values['id'],
+        'title': values['title'],
+        'customer_first_name': values['customer__first_name'],
+        'planned_date': values['planned_date'].isoformat() if values['planned_date'] else None,
+        'planned_minutes': values['planned_minutes'],
+        'order_in_day': values['order_in_day'],
+        'color': values['color'],
+        'status_id': values['status_id'],
+        'version': values['version'],
+    }
+
+def parse_move_request(data):
+    """order_id, planned_date, order_in_day и version из тела запроса переноса"""
+    order_id = int(data.get('order_id'))
+    planned_date = data.get('planned_date')
+    planned_date = datetime.strptime(planned_date, '%Y-%m-%d').date() if planned_date else None
+    try:
+        order_in_day = int(data.get('order_in_day'))
+    except (ValueError, TypeError):
+        order_in_day = None
+    version = data.get('version')
+    version = int(version) if version not in (None, '') else None
+    return order_id, planned_date, order_in_day, version
+
+def get_day_states(user, dates):
+    """Заказы указанных дней в порядке планера: {дата: [заказы]}"""
+    states = {day_date.isoformat(): [] for day_date in dates if day_date}
+    orders = (Order.objects
+              .filter(user=user, planned_date__in=[day_date for day_date in dates if day_date])
+              .order_by('planned_date', 'order_in_day')
+              .values(*PLANNER_ORDER_FIELDS))
+    for values in orders:
+        states[values['planned_date'].isoformat()].append(serialize_planner_order(values))
+    return states
+
+def planner_move_response(user, order_id, planned_date, order_in_day, version):
+    """Выполняет перенос и возвращает (ответ, HTTP-статус).
+
+    При конфликте версий ответ содержит текущее состояние заказа и дней,
+    чтобы клиент поправил планер без перезагрузки страницы.
+    """
+    try:
+        versions, days = move_order(user, order_id, planned_date, order_in_day, version)
+    except Order.DoesNotExist:
+        return {'success': False, 'error': 'Order not found'}, 404
+    except OrderVersionConflict:
+        current = Order.objects.filter(pk=order_id, user=user).values(*PLANNER_ORDER_FIELDS).first()
+        if current is None:
+            return {'success': False, 'error': 'Order not found'}, 404
+        return {
+            'success': False,
+            'conflict': True,
+            'error': 'Заказ изменен на другом устройстве',
+            'order': serialize_planner_order(current),
+            'days': get_day_states(user, {current['planned_date'], planned_date}),
+        }, 409
+    
+    order = Order.objects.select_related('customer').get(pk=order_id)
+    publish_order_event(order, 'moved')
+    response = {
+        'success': True,
+        'order': {
+            'id': order.pk,
+            'planned_date': order.planned_date.isoformat() if order.planned_date else None,
+            'order_in_day': order.order_in_day,
+            'version': versions[order_id],
+        },
+        # Версии соседей, которых сдвинула перенумерация дня
+        'versions': {str(pk): value for pk, value in versions.items()},
+        'days': get_day_states(user, days),
+    }
+    if order.planned_date:
+        work_days = get_planner_settings(user).get_work_days()
+        response['day_total_minutes'] = (
+            sum(item['planned_minutes'] for item in response['days'][order.planned_date.isoformat()])
+            + get_occurrence_minutes(user, order.planned_date, work_days)
+        )
+    return response, 200
+
+async def get_day_minutes(user, planned_date, work_days, exclude_order_id=None):
+    """Сумма планируемых минут за день: заказы одним агрегирующим запросом плюс повторения"""
+    day_orders = Order.objects.filter(user=user, planned_date=planned_date)
+    if exclude_order_id is not None:
+        day_orders = day_orders.exclude(pk=exclude_order_id)
+    result = await day_orders.aaggregate(total=Sum('planned_minutes'))
+    occurrence_minutes = await sync_to_async(get_occurrence_minutes)(user, planned_date, work_days)
+    return (result['total'] or 0) + occurrence_minutes
+
+@async_login_required
+async def planner_data_async(request):
+    start_date = parse_start_date(request.GET.get('start_date'))
+    weeks = parse_weeks(request.GET.get('weeks'))
+    end_date = start_date + timedelta(days=7 * weeks - 1)
+    
+    planner_settings = await PlannerSettings.objects.filter(user=request.user).afirst()
+    if planner_settings is None:
+        planner_settings = await sync_to_async(get_planner_settings)(request.user)
+    work_days = planner_settings.get_work_days()
+    total_day_minutes = planner_settings.hours_per_day * 60
+    
+    # Один запрос на все заказы окна вместо запроса на каждый день
+    orders_by_day = {}
+    planned = (Order.objects
+               .filter(user=request.user, planned_date__range=(start_date, end_date))
+               .order_by('planned_date', 'order_in_day')
+               .values(*PLANNER_ORDER_FIELDS))
+    async for values in planned:
+        orders_by_day.setdefault(values['planned_date'], []).append(serialize_planner_order(values))
+    # Виртуальные повторения тоже занимают время дня
+    occurrences = await sync_to_async(RecurringOrder.expand_for_user)(request.user, start_date, end_date, work_days)
+    
+    days = []
+    for i in range(7 * weeks):
+        day_date = start_date + timedelta(days=i)
+        day_orders = orders_by_day.get(day_date, [])
+        total_minutes = sum(order['planned_minutes'] for order in day_orders)
+        total_minutes += sum(occurrence.planned_minutes for occurrence in occurrences.get(day_date, []))
+        days.append({
+            'date': day_date.isoformat(),
+            'is_work_day': (day_date.weekday() + 1) in work_days,
+            'total_minutes': total_minutes,
+            'day_percentage': min(total_minutes / total_day_minutes * 100, 100) if total_day_minutes else 100,
+            'orders': day_orders,
+        })
+    
+    unplanned = Order.objects.filter(user=request.user, planned_date__isnull=True).values(*PLANNER_ORDER_FIELDS)
+    return JsonResponse({
+        'start_date': start_date.isoformat(),
+        'weeks': weeks,
+        'total_day_minutes': total_day_minutes,
+        'days': days,
+        'orders_without_date': [serialize_planner_order(values) async for values in unplanned],
+    })
+
+@async_login_required
+@require_POST
+async def update_order_planning_async(request):
+    try:
+        order_id, planned_date, order_in_day, version = parse_move_request(json.loads(request.body))
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Invalid data'}, status=400)
+    
+    # Перенос идет в транзакции, поэтому выполняется в потоке
+    response, status = await sync_to_async(planner_move_response)(request.user, order_id, planned_date, order_in_day, version)
+    return JsonResponse(response, status=status)
+
+@async_login_required
+@require_POST
+async def check_day_limit_async(request):
+    try:
+        data = json.loads(request.body)
+        order = await Order.objects.aget(id=data.get('order_id'), user=request.user)
+        planned_date = data.get('planned_date')
+        if not planned_date:
+            return JsonResponse({'can_add': True})
+        planned_date = timezone.datetime.strptime(planned_date, '%Y-%m-%d').date()
+        planner_settings = await PlannerSettings.objects.aget(user=request.user)
+    except (ValueError, TypeError, Order.DoesNotExist, PlannerSettings.DoesNotExist) as e:
+        return JsonResponse({'can_add': True, 'error': str(e)})
+    
+    # Суммируем в БД, не загружая заказы дня в память
+    total_minutes = await get_day_minutes(
+        request.user, planned_date, planner_settings.get_work_days(), exclude_order_id=order.pk
+    )
+    total_minutes += order.planned_minutes or 0
+    
+    day_minutes_limit = planner_settings.hours_per_day * 60
+    return JsonResponse({
+        'can_add': total_minutes <= day_minutes_limit,
+        'total_minutes': total_minutes,
+        'limit': day_minutes_limit
+    })
+
+@async_login_required
+async def order_events(request):
+    """SSE-поток событий заказов пользователя для синхронизации открытых планеров"""
+    # Под WSGI бесконечный поток занял бы воркер до таймаута; 204 - сигнал EventSource
+    # больше не переподключаться
+    if not getattr(settings, 'ATELIER_EVENTS_ENABLED', False) or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user_id = request.user.pk
+    
+    async def stream():
+        subscription = get_broker().subscribe(user_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Комментарий-пинг, чтобы прокси не закрывали соединение
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -29,11 +29,23 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'atelier.middleware.AsyncWhiteNoiseMiddleware',
     'atelier.middleware.AuthenticationMiddleware',
+    'atelier.db_router.ReplicaPinMiddleware',
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Скрипты и стили планера лежат в atelier/static. collectstatic дописывает хеш содержимого
+# к именам файлов и сжимает их gzip и brotli (если установлен пакет Brotli); WhiteNoise
+# отдает файлы с хешем как неизменяемые (Cache-Control: max-age на 10 лет, immutable),
+# поэтому страницы несут только данные и разметку
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 ROOT_URLCONF = 'sewing_atelier.urls'
 
@@ -62,9 +74,42 @@ DATABASES = {
         'USER': 'zomblzum',
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': 'zomblzum.mysql.pythonanywhere-services.com',
+        # Постоянные соединения: 0 - закрывать после каждого запроса, None - без ограничения
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
     }
 }
 
+# Реплика для тяжелых read-only страниц (списки, история клиента, отчеты).
+# Включается, если задан DB_REPLICA_HOST.
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Локальный запуск без MySQL: DB_SQLITE_PATH - основная база, DB_REPLICA_SQLITE_PATH - ее копия
+# в роли реплики (копию обновляют вручную, например cp после migrate)
+if os.getenv('DB_SQLITE_PATH'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_SQLITE_PATH'),
+    }
+if os.getenv('DB_REPLICA_SQLITE_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_REPLICA_SQLITE_PATH'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['atelier.db_router.PrimaryReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы
+ATELIER_REPLICA_PIN_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -107,4 +152,38 @@ CACHES = {
     }
 }
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
\ No newline at end of file
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Живая синхронизация планера (SSE). Поток держит соединение открытым, поэтому
+# включается только при запуске через ASGI (uvicorn); под WSGI (gunicorn) он занимал бы воркер.
+ATELIER_EVENTS_ENABLED = os.getenv('ATELIER_EVENTS_ENABLED', 'false').lower() == 'true'
+# InProcessEventBroker работает в пределах одного ASGI-воркера; для нескольких воркеров -
+# atelier.events.CacheEventBroker с общим кэшем (Redis, Memcached, DatabaseCache).
+ATELIER_EVENTS_BACKEND = os.getenv('ATELIER_EVENTS_BACKEND', 'atelier.events.InProcessEventBroker')
+
+# Архивация завершенных заказов (manage.py archive_orders)
+ATELIER_ARCHIVE_AFTER_DAYS = 90
+ATELIER_ARCHIVE_BATCH_SIZE = 500
+
+# Шаблон нового аккаунта (статусы, стартовые категории, настройки планера):
+# 'default' или 'atelier' из atelier/provisioning.py либо свой в ATELIER_TENANT_TEMPLATES
+ATELIER_TENANT_TEMPLATE = 'default'
+
+# Календарная подписка (.ics): за сколько прошедших дней отдавать заказы
+ATELIER_CALENDAR_PAST_DAYS = 30
+
+# Дельта-синхронизация (api/changes/): сколько секунд свежие записи журнала
+# приходят повторно, пока не закоммитятся параллельные транзакции
+ATELIER_SYNC_SETTLE_SECONDS = 5
+
+# Фоновые задачи (manage.py run_jobs). IMMEDIATE = True выполняет задачи
+# в процессе, поставившем их в очередь, сразу после коммита - для тестов и разработки
+ATELIER_JOBS_IMMEDIATE = os.getenv('ATELIER_JOBS_IMMEDIATE', 'false').lower() == 'true'
+ATELIER_JOBS_MAX_ATTEMPTS = 3
+# Задержка перед повтором упавшей задачи, секунды; удваивается с каждой попыткой
+ATELIER_JOBS_RETRY_DELAY = 30
+# Как часто воркер подает сигнал по выполняемой задаче, секунды
+ATELIER_JOBS_HEARTBEAT_SECONDS = 30
+# Через сколько секунд без сигнала задача "Выполняется" считается брошенной умершим воркером
+ATELIER_JOBS_STALE_SECONDS = 120
+# Сколько дней хранить выполненные и упавшие задачи
+ATELIER_JOBS_KEEP_DAYS = 7